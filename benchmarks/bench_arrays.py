@@ -0,0 +1,49 @@
+"""Large numeric list values: tokenize() + sub_cast vs. to_array()
+
+    python -m benchmarks.bench_arrays [--items 200000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+
+from envwrapper import EnvWrapper, EnvVar
+from envwrapper.arrays import numpy
+
+
+def measure(label: str, env: EnvWrapper, repeat: int):
+    elapsed = min(timeit.repeat(lambda: env.VALUES, number=1, repeat=repeat))
+    tracemalloc.start()
+    value = env.VALUES
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if isinstance(value, list):
+        size = sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    else:
+        size = sys.getsizeof(value)
+    print(f'{label:<18} {elapsed * 1000:8.2f} ms   '
+          f'result {size / 1024:9.1f} KiB   peak {peak / 1024:9.1f} KiB')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ['VALUES'] = ','.join(str(i) for i in range(args.items))
+    print(f'{args.items} comma separated integers')
+
+    measure('tokenize+sub_cast', EnvWrapper(VALUES=EnvVar(
+        postprocessor=EnvVar.tokenize(','), sub_cast=int)), args.repeat)
+    measure("to_array('q')", EnvWrapper(VALUES=EnvVar(
+        convert=EnvVar.to_array('q'))), args.repeat)
+    if numpy is not None:
+        measure('to_array(numpy)', EnvWrapper(VALUES=EnvVar(
+            convert=EnvVar.to_array('q', use_numpy=True))), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Large source files: SimpleParser vs. DotEnvParser throughput
+
+    python -m benchmarks.bench_dotenv [--lines 200000] [--repeat 5]
+"""
+import argparse
+import io
+import timeit
+
+
+from envwrapper.parser import DotEnvParser, SimpleParser
+
+
+def measure(label: str, parser, text: str, repeat: int):
+    elapsed = min(timeit.repeat(
+        lambda: sum(1 for _ in parser(io.StringIO(text))),
+        number=1, repeat=repeat
+    ))
+    print(f'{label:<22} {elapsed * 1000:8.1f} ms   '
+          f'{len(text) / elapsed / 2 ** 20:7.1f} MiB/s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    text = ''.join(
+        f'VARIABLE_{i} = value number {i} with some words   \n'
+        for i in range(args.lines)
+    )
+    print(f'{args.lines} unquoted KEY = value lines, '
+          f'{len(text) / 2 ** 20:.1f} MiB')
+    measure('SimpleParser', SimpleParser(), text, args.repeat)
+    measure('DotEnvParser', DotEnvParser(), text, args.repeat)
+
+    quoted = ''.join(
+        f'export VARIABLE_{i}="value \\"{i}\\"\\nnext line" # comment\n'
+        for i in range(args.lines)
+    )
+    print(f'{args.lines} exported, double quoted lines with escapes')
+    measure('DotEnvParser', DotEnvParser(), quoted, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Memory footprint of EnvWrapper instances, with regression budgets
+
+Wrappers of N envvars are built through EnvWrapper(**vars), from_json,
+from_config and from_source_file. Each scenario goes through three phases:
+decode (building the wrapper), read (reading every envvar once) and export
+(to JSON, INI and source file). For each phase, tracemalloc reports the
+memory still allocated at the end of the phase (steady) and the highest
+allocation during the phase (peak), both per envvar. The objects reachable
+from the wrapper are then broken down by what holds them: EnvVar (EnvVar
+instances and records, with their attributes), closures (conversion
+pipelines and other functions), bundles and the EnvWrapper itself.
+
+The run fails (exit status 1) when a steady or peak allocation per envvar
+exceeds its budget in BUDGETS; tox runs it on 1000 envvars as the memory
+environment. Python 3.8 has no tracemalloc.reset_peak, tracing is then
+restarted for each phase and steady allocations ignore what the phase
+frees of earlier allocations.
+
+    python -m benchmarks.bench_memory [--sizes 1000 10000 100000] [--top 3]
+        [--scenarios kwargs json config source]
+"""
+from typing import Callable, Dict, List, Tuple
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import tracemalloc
+import types
+
+
+from envwrapper import EnvWrapper, EnvVar
+
+
+BUNDLES = 10
+
+# bytes per envvar: (steady, peak), for (scenario, phase)
+BUDGETS: Dict[Tuple[str, str], Tuple[int, int]] = {
+    ('kwargs', 'decode'): (1280, 1536),
+    ('kwargs', 'read'): (64, 256),
+    ('kwargs', 'export'): (64, 768),
+    ('json', 'decode'): (1280, 1792),
+    ('json', 'read'): (64, 256),
+    ('json', 'export'): (64, 768),
+    ('config', 'decode'): (1280, 1792),
+    ('config', 'read'): (64, 256),
+    ('config', 'export'): (64, 768),
+    ('source', 'decode'): (1280, 1536),
+    ('source', 'read'): (64, 256),
+    ('source', 'export'): (64, 768),
+}
+
+
+def names(size: int) -> List[Tuple[str, str]]:
+    """(bundle, name) pairs, one envvar out of two belongs to a bundle"""
+    return [
+        (f'BUNDLE_{i % BUNDLES}' if i % 2 else '', f'MEMORY_{i}')
+        for i in range(size)
+    ]
+
+
+def kwargs_source(size: int) -> Callable[[], EnvWrapper]:
+    def build():
+        return EnvWrapper(**{
+            name: EnvVar(default=str(i), convert=int, bundle=bundle)
+            for i, (bundle, name) in enumerate(names(size))
+        })
+    return build
+
+
+def json_source(size: int) -> Callable[[], EnvWrapper]:
+    document = dict()
+    for i, (bundle, name) in enumerate(names(size)):
+        (document.setdefault(bundle, dict()) if bundle else document)[
+            name] = str(i)
+    text = json.dumps(document)
+    return lambda: EnvWrapper.from_json(io.StringIO(text))
+
+
+def config_source(size: int) -> Callable[[], EnvWrapper]:
+    sections = {'DEFAULT': []}
+    for i, (bundle, name) in enumerate(names(size)):
+        sections.setdefault(bundle or 'DEFAULT', []).append(f'{name} = {i}')
+    text = '\n'.join(
+        f'[{section}]\n' + '\n'.join(lines)
+        for section, lines in sections.items()
+    )
+    return lambda: EnvWrapper.from_config(io.StringIO(text))
+
+
+def source_file_source(size: int) -> Callable[[], EnvWrapper]:
+    text = '\n'.join(f'{name}={i}' for i, (_, name) in enumerate(names(size)))
+    return lambda: EnvWrapper.from_source_file(io.StringIO(text))
+
+
+SCENARIOS = {
+    'kwargs': kwargs_source,
+    'json': json_source,
+    'config': config_source,
+    'source': source_file_source,
+}
+
+
+def read_all(env: EnvWrapper):
+    for name, _ in env.vars:
+        _ = env[name]
+
+
+def export_all(env: EnvWrapper):
+    env.export_many({'json': io.StringIO(), 'ini': io.StringIO(),
+                     'env': io.StringIO()})
+
+
+# objects of these types are accounted on their own, any other object to
+# the closest of them it is reachable from
+OWNERS = {
+    'EnvWrapper': 'EnvWrapper',
+    'EnvVar': 'EnvVar',
+    'EnvRecord': 'EnvVar',
+    '_EnvBundle': 'bundles',
+    'function': 'closures',
+    'cell': 'closures',
+    'method': 'closures',
+    'partial': 'closures',
+}
+
+# shared by every wrapper, hence neither accounted nor walked
+SHARED_TYPES = (type, types.ModuleType, types.CodeType,
+                types.BuiltinFunctionType)
+
+
+def footprint(env: EnvWrapper) -> Dict[str, int]:
+    """Bytes of the objects reachable from env, by owner (see OWNERS).
+    Module globals and os.environ are not walked."""
+    seen = {id(os.environ)}
+    seen.update(id(vars(module)) for module in list(sys.modules.values())
+                if module is not None)
+    owners: Dict[str, int] = dict()
+    stack = [(env, 'EnvWrapper')]
+    while stack:
+        obj, owner = stack.pop()
+        if id(obj) in seen or isinstance(obj, SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        owner = OWNERS.get(type(obj).__name__, owner)
+        owners[owner] = owners.get(owner, 0) + sys.getsizeof(obj)
+        stack.extend((referent, owner) for referent in gc.get_referents(obj))
+    return owners
+
+
+def measure(phase: Callable[[], object]):
+    """Runs phase under tracemalloc, returns its result, the steady and
+    peak allocations in bytes"""
+    gc.collect()
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.stop()
+        tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = phase()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    return result, current - start, peak - start
+
+
+def run(scenario: str, size: int, top: int) -> List[str]:
+    """Prints the footprint of one scenario, returns the exceeded budgets"""
+    build = SCENARIOS[scenario](size)
+    env = None
+    failures = []
+
+    def decode():
+        nonlocal env
+        env = build()
+
+    for phase, call in (('decode', decode),
+                        ('read', lambda: read_all(env)),
+                        ('export', lambda: export_all(env))):
+        _, steady, peak = measure(call)
+        steady_budget, peak_budget = BUDGETS[scenario, phase]
+        over = []
+        if steady / size > steady_budget:
+            over.append(f'steady > {steady_budget} B/var')
+        if peak / size > peak_budget:
+            over.append(f'peak > {peak_budget} B/var')
+
+        owners = footprint(env) if top > 0 else {}
+        breakdown = ', '.join(
+            f'{owner} {owned / size:.0f}'
+            for owner, owned in sorted(
+                owners.items(), key=lambda item: -item[1])[:top]
+        )
+        print(f'{scenario:<7} {size:>7} {phase:<7} '
+              f'steady {steady / size:7.0f} B/var  '
+              f'peak {peak / size:7.0f} B/var  '
+              f'{"OVER BUDGET: " + ", ".join(over) if over else breakdown}')
+        failures.extend(f'{scenario}/{phase}/{size}: {o}' for o in over)
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument('--top', type=int, default=3,
+                        help='owners listed per phase, 0 is faster')
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    failures = []
+    for size in args.sizes:
+        for scenario in args.scenarios:
+            failures.extend(run(scenario, size, args.top))
+    tracemalloc.stop()
+
+    for failure in failures:
+        print(f'budget exceeded: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
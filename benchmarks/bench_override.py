@@ -0,0 +1,47 @@
+"""Cost of contextvars-scoped overrides on the EnvWrapper._get hot path
+
+    python -m benchmarks.bench_override [--number 200000] [--repeat 5]
+"""
+import argparse
+import os
+import timeit
+
+
+from envwrapper import EnvWrapper, EnvVar
+from envwrapper.base import _overrides
+
+
+def measure(label: str, stmt, number: int, repeat: int) -> float:
+    elapsed = min(timeit.repeat(stmt, number=number, repeat=repeat))
+    per_call = elapsed / number * 1e9
+    print(f'{label:<28} {per_call:8.1f} ns')
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['WORKERS'] = '4'
+    env = EnvWrapper(WORKERS=EnvVar(convert=int))
+    var = env._vars['WORKERS']
+
+    lookup = measure('context lookup', _overrides.get,
+                     args.number, args.repeat)
+    raw = measure('pipeline(raw value)',
+                  lambda: var.pipeline(var._get_raw_value()),
+                  args.number, args.repeat)
+    read = measure('env.WORKERS, no override', lambda: env.WORKERS,
+                   args.number, args.repeat)
+    with env.override(WORKERS='8'):
+        measure('env.WORKERS, overridden', lambda: env.WORKERS,
+                args.number, args.repeat)
+
+    print(f'context lookup: {lookup / read:.1%} of a read, '
+          f'read overhead over the bare pipeline {read - raw:.1f} ns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Shipping wrappers to worker processes: pickled size and fan-out time
+
+    python -m benchmarks.bench_pickle [--vars 10000] [--workers 4]
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import io
+import pickle
+import time
+import timeit
+
+
+from envwrapper import EnvWrapper, EnvVar
+
+
+def declare(size: int) -> EnvWrapper:
+    return EnvWrapper(**{
+        f'PICKLE_{i}': EnvVar(default=str(i), convert=int,
+                              bundle=f'BUNDLE_{i % 10}' if i % 2 else '')
+        for i in range(size)
+    })
+
+
+def read_all(env: EnvWrapper) -> int:
+    return sum(1 for name, _ in env.vars if env[name] is not None)
+
+
+def load_and_read(data: bytes) -> int:
+    return read_all(pickle.loads(data))
+
+
+def rebuild(text: str) -> int:
+    return read_all(EnvWrapper.from_json(io.StringIO(text)))
+
+
+def fan_out(label: str, workers: int, fn, arg):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # warm the pool up so that process start up isn't measured
+        executor.submit(int).result()
+        start = time.perf_counter()
+        futures = [executor.submit(fn, arg) for _ in range(workers)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    print(f'{label:<28} {elapsed * 1000:8.1f} ms for {workers} workers')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vars', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    env = declare(args.vars)
+    snapshot = env.snapshot()
+    for label, obj in (('declarations', env), ('with snapshot', snapshot)):
+        data = pickle.dumps(obj)
+        loads = min(timeit.repeat(lambda: pickle.loads(data),
+                                  number=1, repeat=5))
+        print(f'{label:<28} {len(data) / 1024:8.1f} KiB   '
+              f'{len(data) / args.vars:6.1f} B/var   '
+              f'unpickled in {loads * 1000:6.1f} ms')
+
+    text = io.StringIO()
+    env.to_json(text)
+    fan_out('ship snapshot', args.workers, read_all, snapshot)
+    fan_out('ship snapshot pickled once', args.workers, load_and_read,
+            pickle.dumps(snapshot))
+    fan_out('rebuild from JSON in worker', args.workers, rebuild,
+            text.getvalue())
+    print(f'JSON document: {len(text.getvalue()) / 1024:.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
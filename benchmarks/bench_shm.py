@@ -0,0 +1,85 @@
+"""Pre-fork worker pool: every worker resolving its own EnvWrapper from
+os.environ vs. every worker binding to one SharedEnvSnapshot
+
+    python -m benchmarks.bench_shm [--vars 20000] [--workers 8]
+"""
+from multiprocessing import get_context
+import argparse
+import os
+import resource
+import time
+
+
+from envwrapper import EnvWrapper, EnvVar, SharedEnvSnapshot
+
+
+def declare(size: int) -> EnvWrapper:
+    return EnvWrapper(**{
+        f'BENCH_VAR_{i}': EnvVar(convert=int if i % 2 else str,
+                                 default=str(i) * 8)
+        for i in range(size)
+    })
+
+
+def worker(size: int, snapshot_name: str, queue):
+    start = time.perf_counter()
+    env = declare(size)
+    if snapshot_name:
+        snapshot = SharedEnvSnapshot.attach(snapshot_name)
+        env.bind(snapshot)
+    for name in env._vars:
+        env[name]
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, rss))
+    if snapshot_name:
+        env.bind(os.environ)
+        snapshot.close()
+
+
+def run(size: int, workers: int, snapshot_name: str = ''):
+    ctx = get_context('fork')
+    queue = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(size, snapshot_name, queue))
+        for _ in range(workers)
+    ]
+    for p in processes:
+        p.start()
+    results = [queue.get() for _ in processes]
+    for p in processes:
+        p.join()
+    return results
+
+
+def report(label: str, results):
+    elapsed = max(r[0] for r in results)
+    rss = sum(r[1] for r in results) / len(results)
+    print(f'{label:<24} slowest worker {elapsed * 1000:9.1f} ms   '
+          f'mean max RSS {rss / 1024:8.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vars', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    master = declare(args.vars)
+    for name, var in master.vars:
+        os.environ[var.os_name] = var.default
+
+    print(f'{args.vars} envvars, {args.workers} workers')
+    report('os.environ', run(args.vars, args.workers))
+
+    start = time.perf_counter()
+    with SharedEnvSnapshot.create(master) as snapshot:
+        print(f'snapshot created in '
+              f'{(time.perf_counter() - start) * 1000:.1f} ms '
+              f'({snapshot._shm.size / 1024:.1f} KiB shared)')
+        report('shared snapshot',
+               run(args.vars, args.workers, snapshot.name))
+
+
+if __name__ == '__main__':
+    main()
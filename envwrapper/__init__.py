@@ -3,6 +3,9 @@ from .base import EnvVar  # noqa: F401
 from .codecs import EnvWrapperJSONEncoder
 from .codecs import EnvWrapperEncoder, EnvWrapperDecoder
 from .exceptions import ConfigurationError  # noqa: F401
+from .hub import EnvHub  # noqa: F401
+from .layers import LayeredEnv  # noqa: F401
+from .shm import SharedEnvSnapshot  # noqa: F401
 
 
 EnvWrapper.encoder = EnvWrapperEncoder
@@ -0,0 +1,7 @@
+import sys
+
+
+from .cli import main
+
+
+sys.exit(main())
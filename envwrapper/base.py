@@ -1,12 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fnmatch import fnmatchcase
 from importlib import import_module
+from inspect import signature
 from os import environ as os_env
-from ast import literal_eval
 from typing import Iterable, Callable, Mapping, Optional, Any, Type, Tuple, \
-    Generator, TextIO, Union
+    Generator, TextIO, Union, MutableMapping, List, BinaryIO
 import configparser as cfg
+import io
 import json
-
-
+import os
+import pickle
+import threading
+import time
+
+
+from .arrays import ArrayCast
+from .directory import DirectorySource
+from .discovery import EnvironIndex
+from .interpolation import Interpolator
+from .kernels import default_registry, to_bytes
+from .lazy import LazyTokens, Tokenizer
+from .secrets import SecretFileCache
+from .parser import IniReader, JSONObjectStream
 from .parser import SimpleParser as EnvSimpleParser
 
 
@@ -16,6 +33,19 @@ from .exceptions import InclusionError, ExclusionError
 
 BoolValuesType = Tuple[str, str]
 ConvertCallableType = Union[Callable[[str], Any], Type[Any]]
+DiscoveryRulesType = Mapping[str, Union[ConvertCallableType, Mapping]]
+
+
+def identity(val: Any) -> Any:
+    """Default convert of envvars, a module level function so that
+    envvars can be pickled"""
+    return val
+
+
+# raw values overriding envvars in the current context, see override()
+_overrides: ContextVar[Optional[Mapping]] = ContextVar(
+    'envwrapper_overrides', default=None
+)
 
 
 class EnvVar:
@@ -29,10 +59,13 @@ class EnvVar:
     TOKEN_SEP = ' '
     TRUE_STRINGS = ('1', 'true', 'yes', 'on', 'ok', 'y')
     DEFAULT_BOOL_VALUES = ('false', 'true')
+    KERNELS = default_registry()
+    FILE_SUFFIX = '_FILE'
+    SECRETS = SecretFileCache()
 
     def __init__(self,
                  bundle: str = NO_BUNDLE,
-                 convert: ConvertCallableType = lambda t: t,
+                 convert: ConvertCallableType = identity,
                  default: str = EMPTY,
                  include_if: str = None,
                  exclude_if: str = None,
@@ -40,7 +73,10 @@ class EnvVar:
                  postprocessor: Callable[[Any], Any] = None,
                  preprocessor: Callable[[str], str] = None,
                  proxy: str = NO_PROXY,
-                 sub_cast: Callable = None
+                 sub_cast: Callable = None,
+                 interpolate: bool = False,
+                 from_file: bool = False,
+                 binary: bool = False
                  ):
         self._name = None
         self._prefix = prefix
@@ -53,6 +89,28 @@ class EnvVar:
         self._exclude_if = exclude_if
         self._proxy = proxy
         self._sub_cast = sub_cast
+        self._environ = os_env
+        self._resolve = None
+        self._interpolate = interpolate
+        self._interpolator = None
+        self._from_file = from_file
+        self._binary = binary
+        self._os_key = None
+
+        if binary:
+            if getattr(os, 'environb', None) is None:
+                raise ConfigurationError(
+                    'Binary envvars need os.environb, which this platform '
+                    'does not provide'
+                )
+            if interpolate or from_file:
+                raise ConfigurationError(
+                    'Binary envvars cannot be interpolated nor read from '
+                    'files'
+                )
+            self._environ = os.environb
+            if isinstance(default, str):
+                self._default = os.fsencode(default)
 
         if self._exclude_if and self._include_if\
                 and self._exclude_if == self._include_if:
@@ -61,11 +119,44 @@ class EnvVar:
                 'to the same name for an EnvVar instance'
             )
 
+        self._kernel = self.KERNELS.resolve(self)
         self._pipeline = self._make_pipeline()
 
+    def __getstate__(self) -> dict:
+        """Only the declaration travels, arguments left to their default
+        value being omitted. The kernel and the pipeline are built again
+        and the envvar reads os.environ once unpickled."""
+        state = {
+            'bundle': self._bundle, 'convert': self._convert,
+            'default': self._default, 'include_if': self._include_if,
+            'exclude_if': self._exclude_if, 'prefix': self._prefix,
+            'postprocessor': self._postprocessor,
+            'preprocessor': self._preprocessor, 'proxy': self._proxy,
+            'sub_cast': self._sub_cast, 'interpolate': self._interpolate,
+            'from_file': self._from_file, 'binary': self._binary,
+        }
+        state = {
+            key: value for key, value in state.items()
+            if value is not _INIT_DEFAULTS.get(key)
+            and value != _INIT_DEFAULTS.get(key)
+        }
+        state['name'] = self._name
+        return state
+
+    def __setstate__(self, state: dict):
+        state = dict(state)
+        name = state.pop('name')
+        self.__init__(**state)
+        self._name = name
+
     def __str__(self) -> str:
         return self.get_raw_value()
 
+    @property
+    def binary(self) -> bool:
+        """Whether raw values are bytes read from os.environb"""
+        return self._binary
+
     @property
     def bundle(self):
         return self._bundle
@@ -78,10 +169,48 @@ class EnvVar:
     def default(self):
         return self._default
 
+    @property
+    def environ(self) -> Mapping:
+        """The mapping raw values are looked up in, os.environ by default"""
+        return self._environ
+
+    @environ.setter
+    def environ(self, environ: Mapping):
+        self._environ = environ
+        self._resolve = getattr(environ, 'resolve', None)
+
     @property
     def exclude_if(self):
         return self._exclude_if
 
+    @property
+    def interpolate(self) -> bool:
+        """Whether ${NAME} references in the raw value are expanded"""
+        return self._interpolate
+
+    @property
+    def interpolator(self) -> Optional[Interpolator]:
+        return self._interpolator
+
+    @interpolator.setter
+    def interpolator(self, interpolator: Interpolator):
+        if self._binary:
+            raise ConfigurationError('Binary envvars cannot be interpolated')
+        self._interpolate = True
+        self._interpolator = interpolator
+
+    @property
+    def file_path(self) -> Optional[str]:
+        """Path of the file holding the raw value, as set in the OS envvar
+        named after this one and FILE_SUFFIX, e.g. DB_PASSWORD_FILE"""
+        if not self._from_file:
+            return None
+        return self.environ.get(self.os_name + self.FILE_SUFFIX) or None
+
+    @property
+    def from_file(self) -> bool:
+        return self._from_file
+
     @property
     def include_if(self):
         return self._include_if
@@ -103,6 +232,14 @@ class EnvVar:
 
         return self.name
 
+    @property
+    def os_key(self) -> bytes:
+        """OS name of binary envvars, as a key of os.environb. Other
+        mappings are looked up by os_name."""
+        if self._os_key is None:
+            self._os_key = os.fsencode(self.os_name)
+        return self._os_key
+
     @property
     def prefix(self):
         return self._prefix
@@ -118,12 +255,21 @@ class EnvVar:
     @property
     def proxy(self):
         if self._proxy:
-            var = EnvVar(default=self.default)
+            var = EnvVar(default=self.default, binary=self._binary)
             var.name = self._proxy
+            var.environ = self.environ
             return var
         else:
             return None
 
+    @property
+    def spec(self) -> tuple:
+        """What the value of this envvar depends on, envvars declared
+        the same way in different wrappers share the same spec"""
+        return (self.os_name, self._proxy, self.default, self.convert,
+                self.preprocessor, self.postprocessor, self.sub_cast,
+                self._interpolator, self._from_file, self._binary)
+
     @property
     def sub_cast(self):
         return self._sub_cast
@@ -133,19 +279,49 @@ class EnvVar:
         return self.get_value()
 
     def get_raw_value(self) -> str:
+        overrides = _overrides.get()
+        if overrides is not None and self in overrides:
+            val = overrides[self]
+            if self._interpolator is not None:
+                val = self._interpolator.expand(self.name, val)
+            return val
+        return self._get_raw_value()
+
+    def _get_raw_value(self) -> str:
         if self.proxy:
             val = self.proxy.value
+        elif self._binary:
+            if self.environ is os.environb:
+                val = self.environ.get(self.os_key, self.default)
+            else:
+                val = self.environ.get(self.os_name, self.default)
+                if isinstance(val, str):
+                    val = os.fsencode(val)
         else:
-            val = os_env.get(self.os_name, self.default)
+            path = self.file_path if self._from_file else None
+            if path:
+                val = self._read_file(path)
+            else:
+                val = self.environ.get(self.os_name, self.default)
+        if self._interpolator is not None:
+            val = self._interpolator.expand(self.name, val)
         return val
 
+    def _read_file(self, path: str) -> str:
+        try:
+            return self.SECRETS.read(path)
+        except OSError as e:
+            raise ConfigurationError(
+                f'Cannot read {self.os_name}{self.FILE_SUFFIX}: {e}'
+            ) from e
+
     @property
     def pipeline(self):
         return self._pipeline
 
     def _make_pipeline(self) -> Callable[[str], Any]:
         def init():
-            return lambda t: t
+            return identity
 
         def compose(f, g):
             def h(x):
@@ -153,7 +329,9 @@ class EnvVar:
             return h
 
         def iter_cast(x):
-            if isinstance(x, Iterable):
+            if isinstance(x, LazyTokens):
+                return x.cast(self.sub_cast)
+            elif isinstance(x, Iterable):
                 if self.convert is tuple:
                     return tuple((self.sub_cast(item) for item in x))
                 elif self.convert is dict:
@@ -168,7 +346,7 @@ class EnvVar:
         if self.preprocessor:
             p = compose(self.preprocessor, p)
         if self.convert:
-            p = compose(self._cast, p)
+            p = compose(self._kernel, p)
         if self.postprocessor:
             p = compose(self.postprocessor, p)
         if self.sub_cast:
@@ -177,18 +355,15 @@ class EnvVar:
         return p
 
     def get_value(self) -> Any:
-        return self.pipeline(self.get_raw_value())
+        overrides = _overrides.get()
+        if overrides is not None and self in overrides:
+            return self.pipeline(self.get_raw_value())
+        if self._resolve:
+            return self._resolve(self)
+        return self.pipeline(self._get_raw_value())
 
     def _cast(self, val) -> Any:
-        if self.convert is bool:
-            if val.lower() in self.TRUE_STRINGS:
-                return True
-            else:
-                return False
-        elif self.convert in (dict, list, tuple):
-            return literal_eval(val)
-        else:
-            return self.convert(val)
+        return self._kernel(val)
 
     @staticmethod
     def import_class(fully_qualified_class_name: str) -> type:
@@ -209,13 +384,104 @@ class EnvVar:
 
     @staticmethod
     def to_bytes(value) -> bytes:
-        return bytes(value, encoding='utf-8')
+        return to_bytes(value)
 
     @staticmethod
-    def tokenize(sep: str = TOKEN_SEP) -> Callable[[str], Iterable[str]]:
-        def f(val):
-            return val.split(sep)
-        return f
+    def to_array(typecode: str = 'q', sep: str = ',',
+                 use_numpy: bool = False) -> Callable[[str], Any]:
+        """A convert callable parsing delimited numbers into an
+        array.array of the given typecode (or a numpy array)"""
+        return ArrayCast(typecode, sep=sep, use_numpy=use_numpy)
+
+    @staticmethod
+    def tokenize(sep: str = TOKEN_SEP,
+                 lazy: bool = False) -> Callable[[str], Iterable[str]]:
+        """A postprocessor splitting values on sep, lazy tokenization
+        defers splitting and sub casting until items are accessed"""
+        return Tokenizer(sep, lazy)
+
+
+_INIT_DEFAULTS = {
+    name: parameter.default
+    for name, parameter in signature(EnvVar.__init__).parameters.items()
+}
+
+
+class EnvRecord:
+    """Compact stand-in for a decoded envvar, i.e. its name, raw value and
+    bundle. The type of the envvar is only inferred, and the actual EnvVar
+    built, when its value is first read. Raw value lookups, as performed
+    by encoders, never build the EnvVar.
+    """
+    __slots__ = ('name', 'default', 'bundle', '_environ', '_infer', '_var')
+
+    prefix = EnvVar.NO_PREFIX
+    proxy = None
+    interpolate = False
+    include_if = None
+    exclude_if = None
+
+    def __init__(self, name: str, default: str, bundle: str,
+                 infer: Callable[[str], ConvertCallableType]):
+        self.name = name
+        self.default = default
+        self.bundle = bundle
+        self._environ = os_env
+        self._infer = infer
+        self._var = None
+
+    def __getstate__(self) -> tuple:
+        return self.name, self.default, self.bundle, self._infer, self._var
+
+    def __setstate__(self, state: tuple):
+        self.name, self.default, self.bundle, self._infer, self._var = state
+        self._environ = os_env
+
+    def __str__(self) -> str:
+        return self.get_raw_value()
+
+    @property
+    def convert(self) -> ConvertCallableType:
+        if self._var is not None:
+            return self._var.convert
+        return self._infer(self.default)
+
+    @property
+    def environ(self) -> Mapping:
+        return self._environ
+
+    @environ.setter
+    def environ(self, environ: Mapping):
+        self._environ = environ
+        if self._var is not None:
+            self._var.environ = environ
+
+    @property
+    def os_name(self) -> str:
+        return self.name
+
+    @property
+    def value(self) -> Any:
+        return self.get_value()
+
+    def get_raw_value(self) -> str:
+        if self._var is not None:
+            return self._var.get_raw_value()
+        return self._environ.get(self.name, self.default)
+
+    def get_value(self) -> Any:
+        return self.materialize().get_value()
+
+    def materialize(self) -> EnvVar:
+        if self._var is None:
+            var = EnvVar(default=self.default,
+                         convert=self._infer(self.default),
+                         bundle=self.bundle)
+            var.name = self.name
+            if self._environ is not os_env:
+                var.environ = self._environ
+            self._var = var
+        return self._var
 
 
 class EnvWrapper:
@@ -242,35 +508,133 @@ class EnvWrapper:
 
         self._vars = {}
         self._bundles = {}
+        self._pending = {}
+        self._pending_names = {}
+        self._pending_lock = threading.RLock()
+        self._environ = None
+        self._subprocess_env = None
+        self._interpolator = Interpolator(self._reference)
+        self._directory = None
 
         for var_name, var_settings in env_vars.items():
             if isinstance(var_settings, dict):
                 var_settings = EnvVar(var_name, **var_settings)
 
-            assert isinstance(var_settings, EnvVar)
-            var_settings.name = var_name
-            self._vars[var_name] = var_settings
+            self._declare(var_name, var_settings)
+
+    def _declare(self, var_name: str, var: Union[EnvVar, EnvRecord]):
+        if isinstance(var, EnvRecord):
+            assert var.name == var_name
+        else:
+            assert isinstance(var, EnvVar)
+            var.name = var_name
+        if self._environ is not None:
+            var.environ = self._environ
+        if var.interpolate:
+            var.interpolator = self._interpolator
+        self._vars[var_name] = var
+        self._subprocess_env = None
+
+        if var.bundle:
+            self._update_bundle(var)
+
+    def _undeclare(self, var_name: str):
+        var = self._vars.pop(var_name)
+        self._subprocess_env = None
+        if var.bundle:
+            bundle = self._bundles[var.bundle]
+            del bundle[var_name]
+            if not len(bundle):
+                del self._bundles[var.bundle]
+
+    def _defer_bundle(self, bundle: str,
+                      loader: Callable[[], Iterable[Tuple[str, EnvVar]]],
+                      names: Iterable[str]):
+        """Registers a bundle whose envvars, named names, are only
+        declared, by calling loader, when the bundle or one of these
+        envvars is first looked up"""
+        names = list(names)
+        self._pending[bundle] = (loader, names)
+        for name in names:
+            self._pending_names[name] = bundle
+
+    def _load_pending(self, item: Optional[str] = None) -> bool:
+        """Declares the envvars of the deferred bundle named item or
+        declaring item or, without item, of all deferred bundles. Returns
+        whether item is now declared, by this thread or another one."""
+        if not self._pending:
+            return False
+
+        with self._pending_lock:
+            if item is None:
+                bundles = list(self._pending)
+            elif item in self._pending:
+                bundles = [item]
+            elif item in self._pending_names:
+                bundles = [self._pending_names[item]]
+            else:
+                return item in self._vars or item in self._bundles
 
-            if var_settings.bundle:
-                self._update_bundle(var_settings)
+            for bundle in bundles:
+                loader, names = self._pending[bundle]
+                for var_name, var in loader():
+                    self._declare(var_name, var)
+                del self._pending[bundle]
+                for name in names:
+                    self._pending_names.pop(name, None)
+        return True
 
     @property
     def vars(self):
+        self._load_pending()
         return self._vars.items()
 
     @property
     def bundles(self):
+        self._load_pending()
         return self._bundles.items()
 
+    def bind(self, environ: Mapping) -> 'EnvWrapper':
+        """Makes every envvar of this wrapper read its raw value from
+        environ instead of os.environ"""
+        self._environ = environ
+        self._subprocess_env = None
+        for var in self._vars.values():
+            var.environ = environ
+        return self
+
     class _EnvBundle:
+        """Members are partitioned by their (exclude_if, include_if)
+        condition so that reading the bundle resolves each referenced
+        envvar once and skips the partitions whose condition fails"""
+
         def __init__(self, name: str, resolver: Callable[[str], bool]):
             self.name = name
             self._vars = dict()
+            self._partitions = dict()
             self._resolver = resolver
 
-        def __setitem__(self, key: str, value: EnvVar):
-            assert isinstance(value, EnvVar)
+        @staticmethod
+        def _condition(var: Union[EnvVar, EnvRecord]) -> Tuple:
+            return var.exclude_if, var.include_if
+
+        def __setitem__(self, key: str, value: Union[EnvVar, EnvRecord]):
+            assert isinstance(value, (EnvVar, EnvRecord))
+            if key in self._vars:
+                del self[key]
             self._vars[key] = value
+            self._partitions.setdefault(
+                self._condition(value), dict()
+            )[key] = value
+
+        def __delitem__(self, key: str):
+            condition = self._condition(self._vars.pop(key))
+            del self._partitions[condition][key]
+            if not self._partitions[condition]:
+                del self._partitions[condition]
+
+        def __len__(self) -> int:
+            return len(self._vars)
 
         @property
         def vars(self):
@@ -279,12 +643,21 @@ class EnvWrapper:
         @property
         def value(self) -> dict:
             result = dict()
-            for name, var in self._vars.items():
-                if var.exclude_if and self._resolver(var.exclude_if):
+            resolved = dict()
+
+            def resolve(ref_name: str) -> bool:
+                if ref_name not in resolved:
+                    resolved[ref_name] = self._resolver(ref_name)
+                return resolved[ref_name]
+
+            for (exclude_if, include_if), members in \
+                    self._partitions.items():
+                if exclude_if and resolve(exclude_if):
                     continue
-                if var.include_if and not self._resolver(var.include_if):
+                if include_if and not resolve(include_if):
                     continue
-                result[name.lower()] = var.value
+                for name, var in members.items():
+                    result[name.lower()] = var.value
 
             return result
 
@@ -348,6 +721,8 @@ class EnvWrapper:
 
         elif item in self._bundles:
             return self._bundles[item].value
+        elif item.isupper() and self._load_pending(item):
+            return self._get(item, or_raise)
         elif item.isupper():
             raise self._build_exception(item, or_raise, ConfigurationError)
         else:
@@ -359,8 +734,45 @@ class EnvWrapper:
 
     def __getattr__(self, item: str) -> Any:
         """Returns or fails as if item not in dir(self)"""
+        if item.startswith('__'):
+            # special lookups, e.g. by pickle before __setstate__ is run
+            raise AttributeError(item)
         return self._get(item, or_raise=AttributeError)
 
+    def __getstate__(self) -> dict:
+        """Envvars travel as their declaration, deferred bundles being
+        loaded first. The mapping the wrapper is bound to only travels
+        along if it is a plain dict, e.g. a snapshot()."""
+        self._load_pending()
+        return {
+            'vars': self._vars,
+            'environ': self._environ if type(self._environ) is dict
+            else None,
+            'directory': self._directory,
+        }
+
+    def __setstate__(self, state: dict):
+        self.__init__()
+        for var_name, var in state['vars'].items():
+            if isinstance(var, EnvVar):
+                var._name = None  # unpickled envvars are named again
+            self._declare(var_name, var)
+        self._directory = state['directory']
+        if state['environ'] is not None:
+            self.bind(state['environ'])
+
+    def snapshot(self) -> 'EnvWrapper':
+        """A copy of this wrapper bound to a dict of the raw values it
+        currently reads, e.g. to ship resolved values to worker processes
+        along with the declarations. Collected values are already
+        interpolated, hence envvars of the copy are not."""
+        env = pickle.loads(pickle.dumps(self))
+        for var in env._vars.values():
+            if var.interpolate:
+                var._interpolate = False
+                var._interpolator = None
+        return env.bind(self.collect())
+
     def __contains__(self, item: str) -> bool:
         try:
             _ = self._get(item, or_raise=KeyError)
@@ -373,7 +785,9 @@ class EnvWrapper:
         return len(dir(self))
 
     def _resolve_include_exclude(self, ref_name: str) -> bool:
-        if ref_name not in self._vars:
+        if ref_name not in self._vars and self._load_pending(ref_name):
+            return self._resolve_include_exclude(ref_name)
+        elif ref_name not in self._vars:
             raise ConfigurationError(
                 f'Variable {ref_name} is referenced but not declared'
             )
@@ -381,9 +795,11 @@ class EnvWrapper:
 
     def keys(self) -> Iterable[str]:
         """Provided for use by FlaskApp.Config.from_mapping"""
+        self._load_pending()
         return (
             k for k in set(self._vars.keys()) | set(self._bundles.keys())
-            if k in self
+            if k in self._bundles or isinstance(self._vars[k], EnvRecord)
+            or k in self
         )
 
     def items(self) -> Iterable[Tuple[str, Any]]:
@@ -400,17 +816,22 @@ class EnvWrapper:
 
             yield obj.name, obj.value
 
-    def collect(self) -> dict:
-        """Returns a mapping of envvar as exposed by os.env, values
-        are raw UTF-8 strings"""
-        def on_var(d, _, var, __):
-            if not var.proxy:
-                d[var.os_name] = str(var)
-            else:
-                d[var.proxy.name] = str(var)
-
-        serialize = self.encoder(on_var, preserve_case=True)
-        return serialize(self, target=dict)
+    def resolution_table(self):
+        """Resolves every envvar once, the resulting table can be passed
+        to the collect and to_<stuff> methods so that exporting to several
+        formats does not resolve envvars again"""
+        return self.encoder.resolution_table(self)
+
+    def collect(self, table=None) -> dict:
+        """Returns a mapping of envvar as exposed by os.environ, values
+        are raw strings, those of binary envvars being decoded with
+        os.fsdecode"""
+        if table is None:
+            table = self.resolution_table()
+        return dict(zip(table.os_names, (
+            os.fsdecode(raw) if isinstance(raw, bytes) else raw
+            for raw in table.raw_values
+        )))
 
     def __dir__(self) -> Iterable[str]:
         """Provided for use by FlaskApp.Config.from_object"""
@@ -418,7 +839,7 @@ class EnvWrapper:
 
     def to_config(self, f: TextIO, preserve_case: bool = False,
                   bool_values: BoolValuesType = EnvVar.DEFAULT_BOOL_VALUES,
-                  cls=cfg.ConfigParser,
+                  cls=cfg.ConfigParser, table=None,
                   **kwargs):
 
         def append_var_to_default_section(parser, var_name, var, val):
@@ -438,47 +859,226 @@ class EnvWrapper:
             append_var_to_section,
             preserve_case=preserve_case,
             bool_values=bool_values)
-        config = encode(self, target=cls, **kwargs)
+        config = encode(self, target=cls, table=table, **kwargs)
         config.write(f)
 
-    def to_json(self, f: TextIO, preserve_case: bool = False, **kwargs):
+    def to_json(self, f: TextIO, preserve_case: bool = False, table=None,
+                **kwargs):
         return json.dump(self, f, cls=self.DEFAULT_JSON_ENCODER,
-                         preserve_case=preserve_case, **kwargs)
+                         preserve_case=preserve_case, table=table, **kwargs)
 
-    def to_source_file(self, f: TextIO, sort_keys: bool = False,
+    def to_source_file(self, f: Union[TextIO, BinaryIO],
+                       sort_keys: bool = False,
                        space_around_delimiters: bool = False,
                        delimiter: str = '=',
                        value_delimiter: str = '',
                        inline_prefix: str = '',
-                       inline_suffix: str = ''):
-        items = self.collect()
+                       inline_suffix: str = '',
+                       table=None):
+        """Writes NAME=value lines to a text file or, raw values of binary
+        envvars being encoded back to their original bytes, to a binary
+        file"""
+        binary = isinstance(f, (io.RawIOBase, io.BufferedIOBase))
+        if binary:
+            # raw bytes as resolved, not decoded by collect then encoded
+            if table is None:
+                table = self.resolution_table()
+            items = dict(zip(table.os_names, table.raw_values))
+        else:
+            items = self.collect(table)
         keys = sorted(items.keys()) if sort_keys else items.keys()
 
-        def expression_builder(var, value):
-
+        def expression_builder(var):
+            """What goes before and after the value of var"""
             operator = fr' {delimiter} ' \
                        if space_around_delimiters \
                        else delimiter
-            value = value_delimiter + value + value_delimiter
 
             expr = inline_prefix + r' ' + var if inline_prefix else var
             expr += operator
-            expr += value
-            expr = expr + inline_suffix if inline_suffix else expr
-            return expr
+            expr += value_delimiter
+            suffix = value_delimiter + inline_suffix \
+                if inline_suffix else value_delimiter
+            return expr, suffix + '\n'
 
         for name in keys:
-            f.write(f"{expression_builder(name, items[name])}\n")
+            head, tail = expression_builder(name)
+            value = items[name]
+            if binary:
+                if not isinstance(value, bytes):
+                    value = os.fsencode(value)
+                f.write(os.fsencode(head) + value + os.fsencode(tail))
+            else:
+                f.write(f"{head}{value}{tail}")
+
+    def _reference(self, name: str) -> Optional[str]:
+        """Raw value of an envvar referenced by an interpolated value,
+        either declared in this wrapper or looked up by its OS name"""
+        if name not in self._vars:
+            self._load_pending(name)
+        if name in self._vars:
+            return self._vars[name].get_raw_value()
+        environ = os_env if self._environ is None else self._environ
+        return environ.get(name)
+
+    def refresh_files(self) -> List[str]:
+        """Stats the files of all the file backed envvars at once and reads
+        again the ones that changed, returns the names of the envvars
+        whose file changed"""
+        paths = dict()
+        for name, var in self.vars:
+            path = var.file_path if isinstance(var, EnvVar) else None
+            if path:
+                paths.setdefault(path, []).append(name)
+
+        changed = EnvVar.SECRETS.refresh(paths)
+        return [name for path in changed for name in paths[path]]
+
+    def interpolate(self, *names: str) -> 'EnvWrapper':
+        """Expands ${NAME} references in the raw values of the named
+        envvars, or of all non binary envvars if no name is given. NAME is
+        either an envvar of this wrapper, whatever its prefix or proxy, or
+        an OS envvar."""
+        self._load_pending()
+        for name in names or list(self._vars):
+            if name not in self._vars:
+                raise ConfigurationError(
+                    f'Variable {name} is interpolated but not declared'
+                )
+            var = self._vars[name]
+            if isinstance(var, EnvRecord):
+                var = var.materialize()
+            if var.binary and not names:
+                continue
+            if var.binary:
+                raise ConfigurationError(
+                    f'Variable {name} is binary and cannot be interpolated'
+                )
+            var.interpolator = self._interpolator
+        self._subprocess_env = None
+        return self
+
+    @contextmanager
+    def override(self, **values: str):
+        """Overrides the raw values of envvars in the current context
+        only, i.e. in the current thread or asyncio task, until the end of
+        the with block. Overrides can be nested."""
+        overrides = dict(_overrides.get() or {})
+        for name, value in values.items():
+            if name not in self._vars:
+                self._load_pending(name)
+            if name not in self._vars:
+                raise ConfigurationError(
+                    f'Variable {name} is overridden but not declared'
+                )
+            var = self._vars[name]
+            if isinstance(var, EnvRecord):
+                var = var.materialize()
+            if var.binary and isinstance(value, str):
+                value = os.fsencode(value)
+            overrides[var] = value
+
+        # raw values change on entry and again on exit
+        self._subprocess_env = None
+        token = _overrides.set(overrides)
+        try:
+            yield self
+        finally:
+            _overrides.reset(token)
+            self._subprocess_env = None
+
+    def apply_to_environ(self, environ: MutableMapping = None,
+                         table=None) -> List[str]:
+        """Writes the envvars of this wrapper, as given by collect, to
+        os.environ (or environ). Only the names whose value differs are
+        written, the list of which is returned."""
+        environ = os_env if environ is None else environ
+        collected = self.collect(table)
+        changed = [
+            name for name, value in collected.items()
+            if environ.get(name) != value
+        ]
+        for name in changed:
+            environ[name] = collected[name]
+        return changed
+
+    def as_subprocess_env(self, base: Mapping = None) -> dict:
+        """Returns a new dict of base (os.environ by default) merged with
+        the envvars of this wrapper, as expected by the env argument of
+        subprocess functions.
+
+        Each call copies base and collects the envvars, except when both
+        base and the mapping this wrapper is bound to expose a generation
+        counter, e.g. an EnvHub or a LayeredEnv: the merged dict is then
+        only built again once either generation changes, or the envvars
+        of the wrapper are declared, bound, interpolated or overridden,
+        or secret files are read again. os.environ has no such counter,
+        so a wrapper reading it builds the dict on every call."""
+        base = os_env if base is None else base
+        key = (base, getattr(base, 'generation', None),
+               getattr(self._environ, 'generation', None),
+               EnvVar.SECRETS.generation)
+        cacheable = key[1] is not None and key[2] is not None \
+            and _overrides.get() is None
+        if cacheable and self._subprocess_env is not None:
+            cached_key, merged = self._subprocess_env
+            if cached_key[0] is base and cached_key[1:] == key[1:]:
+                return dict(merged)
+
+        merged = dict(base)
+        merged.update(self.collect())
+        if not cacheable:
+            return merged
+        self._subprocess_env = (key, merged)
+        return dict(merged)
+
+    EXPORT_FORMATS = {
+        'env': 'to_source_file',
+        'ini': 'to_config',
+        'json': 'to_json',
+    }
+
+    def export_many(self, targets: Mapping[str, TextIO],
+                    options: Mapping[str, Mapping] = None,
+                    concurrent: bool = False,
+                    max_workers: Optional[int] = None):
+        """Writes this wrapper to several files at once, e.g.
+        env.export_many({'json': f1, 'ini': f2, 'env': f3}).
+
+        Envvars are resolved once for all formats, options maps formats
+        to the keyword arguments of the matching to_<stuff> method.
+        Concurrent exports run each writer in a thread pool."""
+        options = options or {}
+        for fmt in list(targets) + list(options):
+            if fmt not in self.EXPORT_FORMATS:
+                raise ValueError(f"Unknown export format '{fmt}'")
+
+        table = self.resolution_table()
+
+        def export(fmt, f):
+            method = getattr(self, self.EXPORT_FORMATS[fmt])
+            method(f, table=table, **options.get(fmt, {}))
+
+        if not concurrent:
+            for fmt, f in targets.items():
+                export(fmt, f)
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(export, fmt, f)
+                       for fmt, f in targets.items()]
+            for future in futures:
+                future.result()
 
     @classmethod
     def from_source_file(
             cls, f: TextIO,
             bool_values: BoolValuesType = EnvVar.DEFAULT_BOOL_VALUES,
-            parser=None, **kwargs):
+            parser=None, lazy: bool = False, **kwargs):
 
         parser = parser or EnvSimpleParser
         parse = parser(**kwargs)
-        decode = cls.decoder(bool_values=bool_values)
+        decode = cls.decoder(bool_values=bool_values, lazy=lazy)
 
         return decode(parse(f), ())
 
@@ -488,13 +1088,35 @@ class EnvWrapper:
                   parse_float=None,
                   parse_int=None,
                   parse_constant=None,
-                  object_pairs_hook=None, **kwargs):
+                  object_pairs_hook=None, lazy: bool = False,
+                  stream: bool = False, chunk_size: int = 64 * 1024,
+                  **kwargs):
+        """Decodes a JSON object, members holding objects are bundles.
+
+        Streaming reads the file chunk by chunk and decodes members as
+        they are parsed instead of loading the whole document first. The
+        top-level object and bundles are never built as a whole, hence
+        object hooks are not supported when streaming."""
+        decode = cls.decoder(
+            bool_values=EnvVar.DEFAULT_BOOL_VALUES, lazy=lazy)
+
+        if stream:
+            json_decoder = (decoder or json.JSONDecoder)(
+                object_hook=object_hook, parse_float=parse_float,
+                parse_int=parse_int, parse_constant=parse_constant,
+                object_pairs_hook=object_pairs_hook, **kwargs)
+            if json_decoder.object_hook or json_decoder.object_pairs_hook:
+                raise ConfigurationError(
+                    'object_hook and object_pairs_hook cannot be used '
+                    'when streaming JSON documents'
+                )
+            members = JSONObjectStream(json_decoder, chunk_size=chunk_size)
+            return decode((), members(f))
+
         d = json.load(f, cls=decoder, object_hook=object_hook,
                       parse_float=parse_float, parse_int=parse_int,
                       parse_constant=parse_constant,
                       object_pairs_hook=object_pairs_hook, **kwargs)
-        decode = cls.decoder(
-            bool_values=EnvVar.DEFAULT_BOOL_VALUES)
 
         variables = ((k, v) for k, v in d.items() if not isinstance(v, dict))
 
@@ -509,7 +1131,21 @@ class EnvWrapper:
     @classmethod
     def from_config(cls, f: TextIO,
                     bool_values: BoolValuesType = EnvVar.DEFAULT_BOOL_VALUES,
-                    parser_cls=cfg.ConfigParser, **kwargs):
+                    parser_cls=cfg.ConfigParser, lazy: bool = False,
+                    **kwargs):
+        """Decodes an INI file, the default section holds unbundled
+        envvars and each other section is a bundle.
+
+        With parser_cls=IniReader, the file is streamed without
+        configparser. Lazy decoding only declares the envvars of a section
+        when its bundle is first looked up and only builds an EnvVar when
+        its value is first read. It gives the same values as eager
+        decoding, but with configparser, the interpolation errors of a
+        section are only raised on its first lookup."""
+        if issubclass(parser_cls, IniReader):
+            return cls._from_ini_reader(f, parser_cls(**kwargs),
+                                        bool_values, lazy)
+
         parser = parser_cls(**kwargs)
         parser.read_file(f)
 
@@ -520,6 +1156,12 @@ class EnvWrapper:
             for var in parser[parser.default_section]
         )
 
+        if lazy:
+            return cls._decode_sections(variables, (
+                (section, parser[section], parser[section].items)
+                for section in parser.sections()
+            ), bool_values)
+
         def bundles():
             for section in parser.sections():
                 for var in parser[section]:
@@ -527,3 +1169,214 @@ class EnvWrapper:
                     yield section, var, val
 
         return decode(variables, bundles())
+
+    @classmethod
+    def _decode_sections(
+            cls, variables: Iterable[Tuple[str, str]],
+            sections: Iterable[Tuple[str, Iterable[str],
+                                     Callable[[], Iterable[Tuple[str, str]]]]],
+            bool_values: BoolValuesType) -> 'EnvWrapper':
+        """Decodes the (name, value) pairs of the default section right
+        away and defers the decoding of every other section, given as
+        (section, names, pairs) where pairs() returns its (name, value)
+        pairs. As when decoding eagerly, an envvar belongs to the last
+        section declaring it."""
+        owners = dict()
+        bundles = dict()
+        for section, names, pairs in sections:
+            bundle = section.upper()
+            bundles.setdefault(bundle, []).append(pairs)
+            for name in names:
+                owners[name.upper()] = bundle
+
+        def loader(bundle, sources):
+            def load():
+                decode_bundle = cls.decoder(bool_values=bool_values,
+                                            lazy=True)
+                for pairs in sources:
+                    for var, val in pairs():
+                        if owners[var.upper()] == bundle:
+                            decode_bundle.on_processed(var, val, bundle)
+                return decode_bundle.variables.items()
+            return load
+
+        env = cls.decoder(bool_values=bool_values, lazy=True)((
+            (var, val) for var, val in variables if var.upper() not in owners
+        ), ())
+        names = dict()
+        for name, bundle in owners.items():
+            names.setdefault(bundle, []).append(name)
+        for bundle, sources in bundles.items():
+            if bundle in names:
+                env._defer_bundle(bundle, loader(bundle, sources),
+                                  names[bundle])
+        return env
+
+    @classmethod
+    def _from_ini_reader(cls, f: TextIO, reader: IniReader,
+                         bool_values: BoolValuesType,
+                         lazy: bool) -> 'EnvWrapper':
+        decode = cls.decoder(bool_values=bool_values, lazy=lazy)
+        default_section = reader.default_section
+
+        if not lazy:
+            return decode((), (
+                (section if section != default_section else '', var, val)
+                for section, var, val in reader(f)
+            ))
+
+        sections = reader.sections(f)
+        return cls._decode_sections(sections.pop(default_section), (
+            (section, [var for var, _ in pairs], pairs.__iter__)
+            for section, pairs in sections.items()
+        ), bool_values)
+
+    FILE_FORMATS = {'.json': 'json', '.ini': 'ini', '.cfg': 'ini',
+                    '.conf': 'ini', '.env': 'env'}
+
+    @staticmethod
+    def _parse(f: TextIO, fmt: str) -> Iterable[Tuple[str, str, str]]:
+        """Streams the (bundle, name, value) triples of a file in format
+        fmt ('env', 'ini' or 'json'), bundle being empty for unbundled
+        envvars"""
+        if fmt == 'env':
+            return (('', var, val) for var, val in EnvSimpleParser()(f))
+        elif fmt == 'ini':
+            reader = IniReader()
+            return (
+                (section if section != reader.default_section else '',
+                 var, val)
+                for section, var, val in reader(f)
+            )
+        elif fmt == 'json':
+            return JSONObjectStream()(f)
+        name = getattr(f, 'name', None)
+        raise ConfigurationError(f"Unknown file format '{fmt}'" +
+                                 (f' for {name}' if name else ''))
+
+    @classmethod
+    def _parse_file(cls, path: str,
+                    fmt: str) -> List[Tuple[str, str, str]]:
+        with open(path, encoding='utf-8') as f:
+            return list(cls._parse(f, fmt))
+
+    @classmethod
+    def from_files(cls, files: Iterable[Union[str, os.PathLike, Tuple]],
+                   bool_values: BoolValuesType = EnvVar.DEFAULT_BOOL_VALUES,
+                   lazy: bool = False, max_workers: Optional[int] = None,
+                   on_parsed: Callable[[str, float], None] = None):
+        """Decodes several files at once, e.g. base, region and service
+        configurations, later files taking precedence over earlier ones.
+
+        Each item is a path or a (path, format) tuple, the format ('env',
+        'ini' or 'json') being otherwise found from FILE_FORMATS by the
+        extension of the path, 'env' by default. Files are parsed in a
+        thread pool then merged into a single table that is decoded once.
+        on_parsed(path, seconds) is called with the parse time of each
+        file."""
+        def parse(item):
+            path, fmt = item if isinstance(item, tuple) else (item, None)
+            path = os.fspath(path)
+            fmt = fmt or cls.FILE_FORMATS.get(
+                os.path.splitext(path)[1].lower(), 'env')
+            start = time.perf_counter()
+            triples = cls._parse_file(path, fmt)
+            if on_parsed:
+                on_parsed(path, time.perf_counter() - start)
+            return triples
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            parsed = list(executor.map(parse, files))
+
+        table = dict()
+        for triples in parsed:
+            for bundle, var, val in triples:
+                table[var.upper()] = (bundle, var, val)
+
+        decode = cls.decoder(bool_values=bool_values, lazy=lazy)
+        return decode((), table.values())
+
+    @classmethod
+    def from_directory(
+            cls, path,
+            bool_values: BoolValuesType = EnvVar.DEFAULT_BOOL_VALUES,
+            lazy: bool = False, concurrent: bool = False,
+            max_workers: Optional[int] = None) -> 'EnvWrapper':
+        """Decodes a directory holding one file per envvar, e.g. a
+        Kubernetes configmap mount, subdirectories being bundles. Files
+        are read in a thread pool if concurrent. The wrapper keeps track
+        of the files so that refresh_directory() only reads changed ones.
+        """
+        source = DirectorySource(path, concurrent=concurrent,
+                                 max_workers=max_workers)
+        changed, _ = source.read()
+        decode = cls.decoder(bool_values=bool_values, lazy=lazy)
+        env = decode((), changed)
+        env._directory = (source, bool_values, lazy)
+        return env
+
+    def refresh_directory(self) -> List[str]:
+        """Reads again the files of a wrapper decoded by from_directory
+        that changed, declares the envvars of new files, drops those of
+        removed files, and returns the names of all these envvars"""
+        if self._directory is None:
+            raise ConfigurationError('Not decoded from a directory')
+
+        source, bool_values, lazy = self._directory
+        changed, removed = source.read()
+        names = []
+        for _, name in removed:
+            if name in self._vars:
+                self._undeclare(name)
+                names.append(name)
+
+        decode = self.decoder(bool_values=bool_values, lazy=lazy)
+        for bundle, name, value in changed:
+            decode.on_processed(name, value, bundle)
+        for name, var in decode.variables.items():
+            if name in self._vars:
+                self._undeclare(name)
+            self._declare(name, var)
+            names.append(name)
+        return names
+
+    @classmethod
+    def from_prefix(cls, prefix: str, rules: DiscoveryRulesType = None,
+                    environ: Mapping = None,
+                    refresh: bool = False) -> 'EnvWrapper':
+        """Declares an envvar for every name starting with prefix,
+        envvars are named after the rest of their name.
+
+        rules map glob patterns (e.g. '*_PORT') of these names to either a
+        convert argument or EnvVar keyword arguments, first match wins.
+        refresh rebuilds the shared index of names, see EnvironIndex"""
+        index = EnvironIndex.shared(environ, refresh)
+        names = (name[len(prefix):] for name in index.with_prefix(prefix))
+        return cls._discover(names, prefix, rules, environ)
+
+    @classmethod
+    def from_pattern(cls, pattern: str, rules: DiscoveryRulesType = None,
+                     environ: Mapping = None,
+                     refresh: bool = False) -> 'EnvWrapper':
+        """Declares an envvar for every name matching the glob pattern"""
+        index = EnvironIndex.shared(environ, refresh)
+        return cls._discover(index.matching(pattern), EnvVar.NO_PREFIX,
+                             rules, environ)
+
+    @classmethod
+    def _discover(cls, names: Iterable[str], prefix: str,
+                  rules: Optional[DiscoveryRulesType],
+                  environ: Optional[Mapping]) -> 'EnvWrapper':
+        def settings(name):
+            for pattern, rule in (rules or {}).items():
+                if fnmatchcase(name, pattern):
+                    if isinstance(rule, Mapping):
+                        return dict(rule)
+                    return {'convert': rule}
+            return {}
+
+        env = cls(**{
+            name: EnvVar(prefix=prefix, **settings(name))
+            for name in names if name.isupper()
+        })
+        return env.bind(environ) if environ is not None else env
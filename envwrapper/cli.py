@@ -0,0 +1,170 @@
+"""Command line interface
+
+    python -m envwrapper convert config.ini config.json
+    python -m envwrapper collect APP_ --to json
+    python -m envwrapper show config.env [--environ]
+    python -m envwrapper show --prefix APP_
+
+Files are read from stdin and written to stdout when named '-'. Formats
+('env', 'ini' or 'json') are told by file extensions unless given with
+--from and --to, 'env' being the default. --timing reports the time
+spent parsing, decoding, resolving and encoding on stderr.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO
+import argparse
+import os
+import sys
+import time
+
+
+from . import EnvWrapper
+from .exceptions import ConfigurationError
+
+
+FORMATS = sorted(EnvWrapper.EXPORT_FORMATS)
+
+
+class Timer:
+    """Measures named phases, reported in the order they ran"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.phases: Dict[str, float] = dict()
+
+    @contextmanager
+    def __call__(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] = self.phases.get(phase, 0.0) \
+                + time.perf_counter() - start
+
+    def report(self, f: TextIO):
+        if not self.enabled:
+            return
+        for phase, seconds in self.phases.items():
+            f.write(f'{phase:<8} {seconds * 1000:10.2f} ms\n')
+        f.write(f'{"total":<8} {sum(self.phases.values()) * 1000:10.2f} ms\n')
+
+
+def file_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    if path == '-':
+        return 'env'
+    return EnvWrapper.FILE_FORMATS.get(os.path.splitext(path)[1].lower(),
+                                       'env')
+
+
+@contextmanager
+def open_file(path: str, mode: str) -> Iterator[TextIO]:
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+    else:
+        with open(path, mode) as f:
+            yield f
+
+
+def decode(path: str, fmt: Optional[str], environ: bool,
+           timer: Timer) -> EnvWrapper:
+    """Decodes a file, values found in the file are used unless environ"""
+    fmt = file_format(path, fmt)
+    with open_file(path, 'r') as f:
+        triples = EnvWrapper._parse(f, fmt)
+        if timer.enabled:
+            # otherwise parsing is interleaved with decoding
+            with timer('parse'):
+                triples = list(triples)
+        with timer('decode'):
+            env = EnvWrapper.decoder()((), triples)
+    return env if environ else env.bind(dict())
+
+
+def encode(env: EnvWrapper, path: str, fmt: str, timer: Timer):
+    with timer('resolve'):
+        table = env.resolution_table()
+    with timer('encode'), open_file(path, 'w') as f:
+        getattr(env, EnvWrapper.EXPORT_FORMATS[fmt])(f, table=table)
+        if fmt == 'json' and path == '-':
+            f.write('\n')
+
+
+def show(env: EnvWrapper, f: TextIO, timer: Timer):
+    with timer('resolve'):
+        values = [(name, env[name]) for name, _ in env.vars]
+    for name, value in values:
+        f.write(f'{name}={value!r}\n')
+
+
+def convert_command(args, timer: Timer):
+    env = decode(args.input, args.from_format, args.environ, timer)
+    encode(env, args.output, file_format(args.output, args.to_format),
+           timer)
+
+
+def collect_command(args, timer: Timer):
+    with timer('decode'):
+        env = EnvWrapper.from_prefix(args.prefix)
+    encode(env, args.output, file_format(args.output, args.to_format),
+           timer)
+
+
+def show_command(args, timer: Timer):
+    if args.prefix is not None:
+        with timer('decode'):
+            env = EnvWrapper.from_prefix(args.prefix)
+    elif args.input is not None:
+        env = decode(args.input, args.from_format, args.environ, timer)
+    else:
+        raise ConfigurationError('Either a file or --prefix is expected')
+    show(env, sys.stdout, timer)
+
+
+def parser() -> argparse.ArgumentParser:
+    main_parser = argparse.ArgumentParser(
+        prog='envwrapper',
+        description='Converts and inspects configurations'
+    )
+    main_parser.add_argument('--timing', action='store_true',
+                             help='report the time spent in each phase')
+    commands = main_parser.add_subparsers(dest='command', required=True)
+
+    convert = commands.add_parser(
+        'convert', help='convert a file from a format to another')
+    convert.add_argument('input')
+    convert.add_argument('output', nargs='?', default='-')
+    convert.set_defaults(run=convert_command)
+
+    collect = commands.add_parser(
+        'collect', help='write the envvars named with a prefix')
+    collect.add_argument('prefix')
+    collect.add_argument('output', nargs='?', default='-')
+    collect.set_defaults(run=collect_command)
+
+    show_values = commands.add_parser(
+        'show', help='print the resolved values of a file or a prefix')
+    show_values.add_argument('input', nargs='?')
+    show_values.add_argument('--prefix')
+    show_values.set_defaults(run=show_command)
+
+    for command in (convert, show_values):
+        command.add_argument('--from', dest='from_format', choices=FORMATS)
+        command.add_argument('--environ', action='store_true',
+                             help='let the environment override the file')
+    for command in (convert, collect):
+        command.add_argument('--to', dest='to_format', choices=FORMATS)
+    return main_parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parser().parse_args(argv)
+    timer = Timer(args.timing)
+    try:
+        args.run(args, timer)
+    except (ConfigurationError, ValueError, OSError) as e:
+        sys.stderr.write(f'envwrapper: {e}\n')
+        return 1
+    timer.report(sys.stderr)
+    return 0
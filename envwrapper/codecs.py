@@ -1,40 +1,68 @@
-from typing import Any, Callable, Mapping, Tuple, Iterable
-from .base import EnvWrapper, EnvVar, BoolValuesType
+from typing import Any, Callable, List, Mapping, Optional, Tuple, Iterable
+from .base import EnvWrapper, EnvVar, EnvRecord, BoolValuesType
+from .base import ConvertCallableType
+import functools
 import json
+import os
+
+
+def infer_convert(bool_values: BoolValuesType,
+                  value: str) -> ConvertCallableType:
+    if value in bool_values:
+        return bool
+    # best effort to find a suitable type cast for numerical values
+    try:
+        _ = int(value)
+        return int
+    except ValueError:
+        try:
+            _ = float(value)
+            return float
+        except ValueError:
+            return str
 
 
 class EnvWrapperDecoder:
+    """Declares an envvar for every decoded name and value, inferring its
+    type from the value. Lazy decoders only keep compact records and defer
+    type inference to the first read of each envvar."""
 
     OnProcessedCallbackType = Callable[[str, str, str], None]
 
     def __init__(self,
                  bool_values: BoolValuesType = EnvVar.DEFAULT_BOOL_VALUES,
-                 on_processed: OnProcessedCallbackType = None):
+                 on_processed: OnProcessedCallbackType = None,
+                 lazy: bool = False):
         self.bool_values = bool_values
         self.variables = dict()
         self.on_processed = on_processed or self.process_variable
+        self.lazy = lazy
+        # lazy records get this rather than the bound infer_convert, which
+        # would keep the decoder and all of its variables alive
+        self._infer = functools.partial(infer_convert, bool_values)
+
+    def __getstate__(self) -> dict:
+        return {'bool_values': self.bool_values, 'lazy': self.lazy}
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
+
+    def infer_convert(self, value: str) -> ConvertCallableType:
+        return infer_convert(self.bool_values, value)
 
     def process_variable(self,
                          name: str, value: str, bundle: str = '') -> None:
-        if value in self.bool_values:
-            convert = bool
+        name = name.upper()
+        if self.lazy:
+            self.variables[name] = EnvRecord(
+                name, value, bundle.upper(), self._infer
+            )
         else:
-            # best effort to find a suitable type cast for numerical values
-            try:
-                _ = int(value)
-                convert = int
-            except ValueError:
-                try:
-                    _ = float(value)
-                    convert = float
-                except ValueError:
-                    convert = str
-
-        self.variables[name.upper()] = EnvVar(
-            default=value,
-            convert=convert,
-            bundle=bundle.upper()
-        )
+            self.variables[name] = EnvVar(
+                default=value,
+                convert=self.infer_convert(value),
+                bundle=bundle.upper()
+            )
 
     def __call__(self, variables: Iterable[Tuple[str, str]],
                  bundles: Iterable[Tuple[str, str, str]]) -> EnvWrapper:
@@ -47,8 +75,53 @@ class EnvWrapperDecoder:
         return EnvWrapper(**self.variables)
 
 
+class ResolutionTable:
+    """Columnar snapshot of the envvars of an EnvWrapper, each one being
+    resolved exactly once, bundled or not. One table can be shared by
+    several encoders, e.g. to export the same wrapper to several formats.
+
+    Row i holds names[i], vars[i], os_names[i] (the name exposed in
+    os.environ, proxies included), raw_values[i], bools[i] (the boolean
+    value of bool envvars, None for other envvars) and bundles[i] (the
+    bundle name or an empty string). bundle_rows lists the bundles with
+    the row indices of their members.
+    """
+
+    def __init__(self, source: EnvWrapper):
+        self.names: List[str] = []
+        self.vars: List[EnvVar] = []
+        self.os_names: List[str] = []
+        self.raw_values: List[str] = []
+        self.bools: List[Optional[bool]] = []
+        self.bundles: List[str] = []
+        self.bundle_rows: List[Tuple[str, Any, List[int]]] = []
+
+        rows = dict()
+        for name, var in source.vars:
+            rows[name] = len(self.names)
+            proxy = var.proxy
+            self.names.append(name)
+            self.vars.append(var)
+            self.os_names.append(proxy.name if proxy else var.os_name)
+            self.raw_values.append(var.get_raw_value())
+            self.bools.append(
+                bool(var.get_value()) if var.convert is bool else None
+            )
+            self.bundles.append(var.bundle)
+
+        for name, bundle in source.bundles:
+            self.bundle_rows.append(
+                (name, bundle, [rows[var_name] for var_name, _ in bundle.vars])
+            )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
 class EnvWrapperEncoder:
 
+    resolution_table = ResolutionTable
+
     OnVariableCallbackType = Callable[[Any, str, EnvVar, Any], None]
     OnBundleCallbackType = Callable[[Any, str, Mapping], None]
     OnBundledVariableCallbackType = Callable[[Any, str, str, EnvVar], None]
@@ -72,6 +145,16 @@ class EnvWrapperEncoder:
         else:
             return var.get_raw_value()
 
+    def encoded_values(self, table: ResolutionTable) -> List[str]:
+        """Same as convert_bool_string for every row of table, raw values
+        of binary envvars being decoded"""
+        bool_values = self.bool_values
+        return [
+            (os.fsdecode(raw) if isinstance(raw, bytes) else raw)
+            if flag is None else bool_values[int(flag)]
+            for raw, flag in zip(table.raw_values, table.bools)
+        ]
+
     def ensure_case(self, name: str) -> str:
         return name if self.preserve_case else name.lower()
 
@@ -87,35 +170,44 @@ class EnvWrapperEncoder:
     def on_bundled_variable(self) -> OnBundledVariableCallbackType:
         return self._on_bundled_variable_callback
 
-    def __call__(self, source: EnvWrapper, target, *args, **kwargs):
+    def __call__(self, source: EnvWrapper, target, *args,
+                 table: ResolutionTable = None, **kwargs):
 
         if callable(target):
             target = target(*args, **kwargs)
 
+        if not self.on_variable and not self.on_bundle:
+            return target
+
+        if table is None:
+            table = ResolutionTable(source)
+        values = self.encoded_values(table)
+        names = [self.ensure_case(name) for name in table.names]
+
         if self.on_variable:
-            for name, var in source.vars:
-                self.on_variable(target, self.ensure_case(name), var,
-                                 self.convert_bool_string(var))
+            for row, var in enumerate(table.vars):
+                self.on_variable(target, names[row], var, values[row])
 
         if self.on_bundle:
-            for name, bundle in source.bundles:
-                self.on_bundle(target, self.ensure_case(name), bundle)
+            for name, bundle, rows in table.bundle_rows:
+                name = self.ensure_case(name)
+                self.on_bundle(target, name, bundle)
                 if self.on_bundled_variable:
-                    for var_name, var in bundle.vars:
+                    for row in rows:
                         self.on_bundled_variable(
-                            target,
-                            self.ensure_case(name),
-                            self.ensure_case(var_name),
-                            var, self.convert_bool_string(var)
+                            target, name, names[row],
+                            table.vars[row], values[row]
                         )
         return target
 
 
 class EnvWrapperJSONEncoder(json.JSONEncoder):
 
-    def __init__(self, *, preserve_case: bool = False, **kw):
+    def __init__(self, *, preserve_case: bool = False,
+                 table: ResolutionTable = None, **kw):
         super().__init__(**kw)
         self.preserve_case = preserve_case
+        self.table = table
 
     def default(self, env):
         if isinstance(env, EnvWrapper):
@@ -137,7 +229,7 @@ class EnvWrapperJSONEncoder(json.JSONEncoder):
                 bool_values=EnvVar.DEFAULT_BOOL_VALUES
             )
 
-            return encode(env, target=dict)
+            return encode(env, target=dict, table=self.table)
 
         else:  # pragma: nocover
             return super().default(env)
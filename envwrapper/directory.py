@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import os
+
+
+from .exceptions import ConfigurationError
+from .secrets import strip_newline
+
+
+EntryKeyType = Tuple[str, str]
+
+
+def envvar_name(path: str) -> str:
+    """Name of the envvar (or bundle) held by a file (or directory),
+    uppercased with '-' and '.', common in configmap keys, becoming '_'"""
+    file_name = os.path.basename(path)
+    name = file_name.replace('-', '_').replace('.', '_').upper()
+    if not name.isidentifier() or not name.isupper():
+        raise ConfigurationError(
+            f'Cannot name an envvar after {path}: {file_name!r} has no '
+            f'letter or is not an identifier'
+        )
+    return name
+
+
+class DirectorySource:
+    """Directory holding one file per envvar, as configmaps and secrets
+    are mounted by Kubernetes
+
+    Files are named after their envvar, subdirectories hold the envvars
+    of the bundle they are named after, see envvar_name. Hidden entries,
+    e.g. the '..data' links of Kubernetes mounts, are skipped. Each read()
+    scans the tree once with os.scandir and only reads the files that are
+    new or whose inode, modification time or size has changed since the
+    previous read.
+    """
+
+    def __init__(self, path, concurrent: bool = False,
+                 max_workers: Optional[int] = None):
+        self.path = os.fspath(path)
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        # (stat key, (bundle, name) named after envvars) by file
+        self._index: Dict[EntryKeyType, Tuple[Tuple[int, int, int],
+                                              EntryKeyType]] = dict()
+
+    def scan(self) -> Dict[EntryKeyType, os.DirEntry]:
+        """Files of the tree keyed by (bundle, name), unbundled envvars
+        having an empty bundle"""
+        entries = dict()
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    with os.scandir(entry.path) as sub:
+                        for member in sub:
+                            if not member.name.startswith('.') \
+                                    and member.is_file():
+                                entries[entry.name, member.name] = member
+                elif entry.is_file():
+                    entries['', entry.name] = entry
+        return entries
+
+    @staticmethod
+    def _read(path: str) -> str:
+        with open(path) as f:
+            return strip_newline(f.read())
+
+    def read(self) -> Tuple[List[Tuple[str, str, str]], List[EntryKeyType]]:
+        """Returns the (bundle, name, value) triples of the files that
+        changed since the previous read, and the (bundle, name) pairs of
+        the files that were removed, named after their envvars. Nothing
+        is read if a new file can't be named after an envvar."""
+        entries = self.scan()
+        changed = []
+        for key, entry in entries.items():
+            st = entry.stat()
+            stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            indexed = self._index.get(key)
+            if indexed is None:
+                bundle = os.path.dirname(entry.path)
+                names = (envvar_name(bundle) if key[0] else '',
+                         envvar_name(entry.path))
+            elif indexed[0] != stat_key:
+                names = indexed[1]
+            else:
+                continue
+            changed.append((key, names, entry.path, stat_key))
+        removed = [key for key in self._index if key not in entries]
+
+        paths = [path for _, _, path, _ in changed]
+        if self.concurrent and len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                values = list(executor.map(self._read, paths))
+        else:
+            values = [self._read(path) for path in paths]
+
+        removed = [self._index.pop(key)[1] for key in removed]
+        for key, names, _, stat_key in changed:
+            self._index[key] = (stat_key, names)
+
+        return [
+            (bundle, name, value)
+            for (_, (bundle, name), _, _), value in zip(changed, values)
+        ], removed
@@ -0,0 +1,82 @@
+from bisect import bisect_left
+from fnmatch import fnmatchcase
+from os import environ as os_env
+from typing import Dict, List, Mapping, Optional, Tuple
+import re
+import weakref
+
+
+_WILDCARDS = re.compile(r'[*?\[]')
+
+
+class EnvironIndex:
+    """Sorted index over the names of one environ snapshot, answering
+    prefix and glob pattern lookups without scanning every name
+
+    Indexes are meant to be shared: EnvironIndex.shared() hands out the
+    same instance to every caller looking up the same mapping, without
+    scanning it. Mappings exposing a generation counter (EnvHub,
+    LayeredEnv) get a new index when their generation changes; for others,
+    e.g. os.environ, only a change in the number of names is noticed, an
+    envvar being renamed calls for shared(refresh=True) or invalidate().
+
+    Shared indexes only hold weak references to their mappings. Mappings
+    that cannot be weakly referenced, e.g. plain dicts, get a new index on
+    every call rather than being kept alive by the cache.
+    """
+
+    _shared: Dict[int, Tuple[weakref.ref, 'EnvironIndex']] = dict()
+
+    def __init__(self, environ: Mapping = os_env):
+        self._generation = getattr(environ, 'generation', None)
+        self._names = sorted(environ)
+
+    @classmethod
+    def shared(cls, environ: Optional[Mapping] = None,
+               refresh: bool = False) -> 'EnvironIndex':
+        environ = os_env if environ is None else environ
+        key = id(environ)
+        entry = cls._shared.get(key)
+        if not refresh and entry is not None and entry[0]() is environ \
+                and not entry[1].is_stale(environ):
+            return entry[1]
+
+        index = cls(environ)
+        try:
+            ref = weakref.ref(environ,
+                              lambda _: cls._shared.pop(key, None))
+        except TypeError:
+            return index
+        cls._shared[key] = (ref, index)
+        return index
+
+    def is_stale(self, environ: Mapping) -> bool:
+        """Whether the generation or, lacking one, the number of names of
+        environ differs from the indexed one"""
+        generation = getattr(environ, 'generation', None)
+        if generation is not None:
+            return generation != self._generation
+        return len(environ) != len(self._names)
+
+    @classmethod
+    def invalidate(cls):
+        cls._shared.clear()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        names = self._names
+        start = end = bisect_left(names, prefix)
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[start:end]
+
+    def matching(self, pattern: str) -> List[str]:
+        """Names matching a case-sensitive glob pattern, only the names
+        sharing the literal head of the pattern are tested"""
+        head = _WILDCARDS.split(pattern, maxsplit=1)[0]
+        return [
+            name for name in self.with_prefix(head)
+            if fnmatchcase(name, pattern)
+        ]
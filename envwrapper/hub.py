@@ -0,0 +1,111 @@
+from array import array
+from copy import copy
+from datetime import timedelta
+from os import environ as os_env
+from typing import Any, Callable, Iterator, Mapping, Optional
+
+
+from .arrays import numpy
+from .lazy import LazyTokens
+from .literals import _clone
+
+
+_IMMUTABLE = (str, bytes, int, float, complex, type(None), timedelta,
+              frozenset, LazyTokens)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def sharing(value: Any) -> Optional[Callable[[Any], Any]]:
+    """Returns how to hand out a shared value so that readers can't
+    mutate it for others: as is, cloned or copied. Values of other types
+    may be mutable and are not shared, None is returned."""
+    if isinstance(value, _IMMUTABLE):
+        return _identity
+    if type(value) in (dict, list, tuple):
+        return _clone
+    if isinstance(value, array) \
+            or numpy is not None and isinstance(value, numpy.ndarray):
+        return copy
+    return None
+
+
+class EnvHub(Mapping):
+    """Owns a single snapshot of os.environ (or of any other mapping)
+    that many EnvWrapper instances bind to
+
+    Every bound wrapper reads the same consistent snapshot until it is
+    refreshed. Values are resolved once per snapshot generation for all
+    envvars declared the same way (same OS name, proxy, default and
+    pipeline), whichever wrapper they belong to. Values read from secret
+    files are resolved again once EnvVar.SECRETS reads changed files.
+    Each read still returns a value of its own: containers and arrays are
+    copied, values of unknown types are resolved again.
+    """
+
+    def __init__(self, environ: Mapping = os_env):
+        self._source = environ
+        self._source_generation = getattr(environ, 'generation', None)
+        self._snapshot = dict(environ)
+        self._generation = 0
+        self._values = dict()
+
+    @property
+    def generation(self) -> int:
+        """Incremented each time a refresh changes the snapshot"""
+        return self._generation
+
+    def bind(self, *wrappers) -> 'EnvHub':
+        for env in wrappers:
+            env.bind(self)
+        return self
+
+    def refresh(self, force: bool = False) -> bool:
+        """Takes a new snapshot of the source, returns whether it changed.
+        Sources exposing a generation counter are only copied when their
+        generation has changed, unless forced to."""
+        source_generation = getattr(self._source, 'generation', None)
+        if not force and source_generation is not None \
+                and source_generation == self._source_generation:
+            return False
+
+        self._source_generation = source_generation
+        snapshot = dict(self._source)
+        if snapshot == self._snapshot:
+            return False
+
+        self._snapshot = snapshot
+        self._values = dict()
+        self._generation += 1
+        return True
+
+    def resolve(self, var) -> Any:
+        """Returns the value of var, computed once per generation for all
+        envvars sharing the same specification"""
+        try:
+            entry = self._values.get(var.spec)
+        except TypeError:
+            return var.pipeline(var._get_raw_value())
+        files = var.SECRETS.generation if var.from_file else None
+        if entry is None or entry[2] != files:
+            value = var.pipeline(var._get_raw_value())
+            share = sharing(value)
+            if share is None:
+                return value
+            entry = self._values[var.spec] = (value, share, files)
+        value, share, _ = entry
+        return share(value)
+
+    def get(self, key: str, default=None):
+        return self._snapshot.get(key, default)
+
+    def __getitem__(self, key: str) -> str:
+        return self._snapshot[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
@@ -0,0 +1,109 @@
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+import re
+import threading
+
+
+from .exceptions import ConfigurationError
+
+
+_REFERENCE = re.compile(
+    r'\$\$|\$\{(?P<name>[A-Za-z_][A-Za-z0-9_]*)(?::-(?P<fallback>[^}]*))?\}'
+)
+
+
+class Template:
+    """Raw value split into literal chunks and ${NAME} references
+
+    ${NAME:-fallback} falls back to fallback when NAME is unset or empty
+    and $$ stands for a literal $. Anything else is kept as is.
+    """
+
+    __slots__ = ('literals', 'references')
+
+    def __init__(self, raw: str):
+        self.literals: List[str] = []
+        self.references: List[Tuple[str, Optional[str]]] = []
+        chunk, pos = [], 0
+        for m in _REFERENCE.finditer(raw):
+            chunk.append(raw[pos:m.start()])
+            pos = m.end()
+            if m['name'] is None:
+                chunk.append('$')
+            else:
+                self.literals.append(''.join(chunk))
+                self.references.append((m['name'], m['fallback']))
+                chunk = []
+        chunk.append(raw[pos:])
+        self.literals.append(''.join(chunk))
+
+    def render(self, values: Tuple[str, ...]) -> str:
+        parts = [self.literals[0]]
+        for value, literal in zip(values, self.literals[1:]):
+            parts.append(value)
+            parts.append(literal)
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=1024)
+def parse_template(raw: str) -> Template:
+    return Template(raw)
+
+
+class Interpolator:
+    """Expands the ${NAME} references of raw values
+
+    References are looked up with lookup(name), which returns None for
+    unknown names, and are expanded before the values referencing them.
+    Circular references raise a ConfigurationError. The expansion of each
+    name is memoized until its raw value or the value of one of its
+    references changes.
+    """
+
+    def __init__(self, lookup: Callable[[str], Optional[str]]):
+        self._lookup = lookup
+        self._memo = dict()
+        self._local = threading.local()
+
+    def expand(self, name: str, raw: str) -> str:
+        if '$' not in raw:
+            return raw
+        template = parse_template(raw)
+        if not template.references:
+            return template.literals[0]
+
+        stack = self._local.__dict__.setdefault('stack', [])
+        if name in stack:
+            cycle = stack[stack.index(name):] + [name]
+            raise ConfigurationError(
+                f'Circular reference: {" -> ".join(cycle)}'
+            )
+        stack.append(name)
+        try:
+            values = tuple(
+                self._reference(name, ref, fallback)
+                for ref, fallback in template.references
+            )
+        finally:
+            stack.pop()
+
+        key = (raw, values)
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        expanded = template.render(values)
+        self._memo[name] = (key, expanded)
+        return expanded
+
+    def _reference(self, name: str, ref: str,
+                   fallback: Optional[str]) -> str:
+        value = self._lookup(ref)
+        if value:
+            return value
+        if fallback is not None:
+            return fallback
+        if value is None:
+            raise ConfigurationError(
+                f'Variable {ref} is referenced by {name} but not declared'
+            )
+        return value
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from typing import Any, Callable, Hashable, Union
+import json
+import re
+
+
+from .exceptions import ConfigurationError
+from .literals import LiteralParser
+
+
+KernelType = Callable[[str], Any]
+KernelFactoryType = Callable[[Any], KernelType]
+
+
+class CastKernelRegistry:
+    """Maps the convert argument of an EnvVar to the function actually
+    casting its raw value (a.k.a. a cast kernel)
+
+    Kernels are resolved once, when an EnvVar is built, so that reading
+    an envvar costs a single call whatever its convert argument is.
+    Keys are either types (bool, int, dict...) or names ('duration',
+    'json'...). A convert argument that is not a key is used as is.
+    """
+
+    def __init__(self):
+        self._factories = dict()
+
+    def register(self, key: Hashable, kernel: KernelType):
+        """Registers a kernel shared by all envvars converted by key"""
+        self.register_factory(key, _Constant(kernel))
+
+    def register_factory(self, key: Hashable, factory: KernelFactoryType):
+        """Registers a callable building a kernel for a given EnvVar"""
+        self._factories[key] = factory
+
+    def unregister(self, key: Hashable):
+        """Removes the kernel registered under key, raises a KeyError if
+        there is none. EnvVars already built keep their kernel."""
+        del self._factories[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        try:
+            return key in self._factories
+        except TypeError:
+            return False
+
+    def resolve(self, var) -> KernelType:
+        convert = var.convert
+        if convert in self:
+            return self._factories[convert](var)
+        elif isinstance(convert, str):
+            raise ConfigurationError(
+                f"No cast kernel registered under the name '{convert}'"
+            )
+        return convert
+
+
+class _Constant:
+    def __init__(self, kernel: KernelType):
+        self.kernel = kernel
+
+    def __call__(self, _) -> KernelType:
+        return self.kernel
+
+
+def bool_kernel(var) -> KernelType:
+    true_strings = frozenset(var.TRUE_STRINGS)
+    if var.binary:
+        true_strings = frozenset(s.encode() for s in true_strings)
+
+    def cast(val: str) -> bool:
+        return val.lower() in true_strings
+    return cast
+
+
+def to_bytes(val: Union[str, bytes]) -> bytes:
+    if isinstance(val, bytes):
+        return val
+    return bytes(val, encoding='utf-8')
+
+
+def to_json(val: str) -> Any:
+    return json.loads(val)
+
+
+DURATION_UNITS = {
+    'us': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600, 'd': 86400,
+    'w': 604800
+}
+_DURATION_PART = re.compile(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*(us|ms|s|m|h|d|w)')
+
+
+def to_duration(val: str) -> timedelta:
+    """Parses '90', '1.5h', '1h30m' or '250ms' into a timedelta,
+    bare numbers are seconds"""
+    try:
+        seconds = float(val)
+    except ValueError:
+        seconds, pos, text = 0.0, 0, val.strip()
+        if not text:
+            raise ValueError(f'Invalid duration: {val!r}')
+        while pos < len(text):
+            m = _DURATION_PART.match(text, pos)
+            if not m:
+                raise ValueError(f'Invalid duration: {val!r}')
+            seconds += float(m.group(1)) * DURATION_UNITS[m.group(2)]
+            pos = m.end()
+    try:
+        return timedelta(seconds=seconds)
+    except (OverflowError, ValueError):
+        # infinite, NaN or beyond timedelta.max
+        raise ValueError(f'Invalid duration: {val!r}') from None
+
+
+BYTESIZE_UNITS = {
+    '': 1, 'b': 1,
+    'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40,
+    'kb': 10 ** 3, 'mb': 10 ** 6, 'gb': 10 ** 9, 'tb': 10 ** 12,
+    'kib': 1 << 10, 'mib': 1 << 20, 'gib': 1 << 30, 'tib': 1 << 40,
+}
+_BYTESIZE = re.compile(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*([a-zA-Z]*)\s*$')
+
+
+def to_bytesize(val: str) -> int:
+    """Parses '512', '64k', '10MB' or '1.5GiB' into a number of bytes,
+    single letter units are binary multiples"""
+    m = _BYTESIZE.match(val)
+    unit = m.group(2).lower() if m else None
+    if unit not in BYTESIZE_UNITS:
+        raise ValueError(f'Invalid byte size: {val!r}')
+    number = m.group(1)
+    if '.' in number:
+        try:
+            return int(float(number) * BYTESIZE_UNITS[unit])
+        except OverflowError:
+            raise ValueError(f'Invalid byte size: {val!r}') from None
+    return int(number) * BYTESIZE_UNITS[unit]
+
+
+def default_registry() -> CastKernelRegistry:
+    registry = CastKernelRegistry()
+    registry.register_factory(bool, bool_kernel)
+    registry.register(int, int)
+    registry.register(float, float)
+    registry.register(bytes, to_bytes)
+    parse_literal = LiteralParser()
+    for key in (dict, list, tuple, 'literal'):
+        registry.register(key, parse_literal)
+    registry.register('json', to_json)
+    registry.register('duration', to_duration)
+    registry.register('bytesize', to_bytesize)
+    return registry
@@ -0,0 +1,102 @@
+from os import environ as os_env
+from typing import Iterator, Mapping, Optional, Sequence
+
+
+class LayeredEnv(Mapping):
+    """Stack of mappings read as a single environment, later layers taking
+    precedence over earlier ones, e.g. defaults, decoded files, os.environ
+    and overrides, from lowest to highest precedence
+
+    The layers are merged once into an index answering lookups in constant
+    time, whatever the number of layers. Layers are not watched: refresh()
+    merges them again, e.g. after os.environ has changed.
+
+    Child environments only hold their own overrides on top of the index
+    of the root environment, which is shared and never copied. They see
+    the root being refreshed.
+    """
+
+    def __init__(self, *layers: Mapping):
+        self._layers = layers
+        self._root = self
+        self._overrides = dict()
+        self._index = self._merge()
+        self._generation = 0
+
+    @classmethod
+    def stack(cls, defaults: Optional[Mapping] = None,
+              files: Sequence[Mapping] = (),
+              environ: Optional[Mapping] = os_env,
+              overrides: Optional[Mapping] = None) -> 'LayeredEnv':
+        layers = (defaults, *files, environ, overrides)
+        return cls(*(layer for layer in layers if layer is not None))
+
+    def _merge(self) -> dict:
+        index = dict()
+        for layer in self._layers:
+            index.update(layer)
+        return index
+
+    @property
+    def layers(self) -> tuple:
+        """Layers of the root environment, lowest precedence first"""
+        return self._root._layers
+
+    @property
+    def overrides(self) -> Mapping:
+        """Overrides of a child environment, its parents' included"""
+        return self._overrides
+
+    @property
+    def generation(self) -> int:
+        """Incremented each time a refresh changes the merged layers"""
+        return self._root._generation
+
+    def child(self, layer: Optional[Mapping] = None,
+              **overrides: str) -> 'LayeredEnv':
+        """A new environment overriding this one with layer and/or keyword
+        overrides, without copying the layers below"""
+        env = self.__class__.__new__(self.__class__)
+        env._root = self._root
+        env._overrides = {**self._overrides, **(layer or {}), **overrides}
+        return env
+
+    def refresh(self) -> bool:
+        """Merges the root layers again, returns whether anything changed"""
+        root = self._root
+        index = root._merge()
+        if index == root._index:
+            return False
+        root._index = index
+        root._generation += 1
+        return True
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            return self._overrides[key]
+        except KeyError:
+            return self._root._index[key]
+
+    def get(self, key: str, default=None):
+        value = self._overrides.get(key, self)
+        if value is self:
+            return self._root._index.get(key, default)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._overrides or key in self._root._index
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._overrides
+        for key in self._root._index:
+            if key not in self._overrides:
+                yield key
+
+    def __len__(self) -> int:
+        index = self._root._index
+        return len(index) + sum(1 for key in self._overrides
+                                if key not in index)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self)} envvars, ' \
+               f'{len(self._overrides)} overrides)'
@@ -0,0 +1,107 @@
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+
+class LazyTokens(Sequence):
+    """A sequence over the tokens of a delimited string, tokens are located
+    and cast on demand only
+
+    It behaves as val.split(sep) mapped by cast would, but len() only
+    counts separators, indexing scans the value up to the requested token
+    and cast tokens are memoized so that they are converted once at most.
+    """
+
+    def __init__(self, value: str, sep: str,
+                 cast: Optional[Callable[[str], Any]] = None):
+        if not sep:
+            raise ValueError('LazyTokens requires a non-empty separator')
+        self._value = value
+        self._sep = sep
+        self._cast = cast
+        self._len = None
+        self._starts = [0]
+        self._items = dict()
+
+    def cast(self, cast: Callable[[str], Any]) -> 'LazyTokens':
+        """Returns the same tokens, each one cast as it is accessed"""
+        if self._cast:
+            def chained(token, _inner=self._cast):
+                return cast(_inner(token))
+        else:
+            chained = cast
+        return LazyTokens(self._value, self._sep, chained)
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = self._value.count(self._sep) + 1
+        return self._len
+
+    def _token(self, index: int) -> str:
+        starts, value, sep = self._starts, self._value, self._sep
+        while len(starts) <= index:
+            pos = value.find(sep, starts[-1])
+            starts.append(pos + len(sep))
+        end = value.find(sep, starts[index])
+        return value[starts[index]:end if end >= 0 else len(value)]
+
+    def _item(self, index: int) -> Any:
+        if index not in self._items:
+            token = self._token(index)
+            self._items[index] = self._cast(token) if self._cast else token
+        return self._items[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('LazyTokens index out of range')
+        return self._item(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        value, sep, cast = self._value, self._sep, self._cast
+        index, start = 0, 0
+        while True:
+            if index in self._items:
+                item = self._items[index]
+                end = value.find(sep, start)
+            else:
+                end = value.find(sep, start)
+                token = value[start:end if end >= 0 else len(value)]
+                item = cast(token) if cast else token
+            yield item
+            if end < 0:
+                return
+            index, start = index + 1, end + len(sep)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (LazyTokens, list, tuple)):
+            return len(self) == len(other) and \
+                all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self._value!r}, sep={self._sep!r})'
+
+
+class Tokenizer:
+    """Postprocessor splitting values on sep, into LazyTokens if lazy"""
+
+    __slots__ = ('sep', 'lazy')
+
+    def __init__(self, sep: str, lazy: bool = False):
+        self.sep = sep
+        self.lazy = lazy
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Tokenizer):
+            return (self.sep, self.lazy) == (other.sep, other.lazy)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((Tokenizer, self.sep, self.lazy))
+
+    def __call__(self, val: str):
+        if self.lazy:
+            return LazyTokens(val, self.sep)
+        return val.split(self.sep)
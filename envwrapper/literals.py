@@ -0,0 +1,166 @@
+from ast import literal_eval
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any
+import json
+import re
+import threading
+
+
+class _Unsupported(Exception):
+    """Raised when a value is outside of the restricted literal subset"""
+
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<str>'[^'\\\n]*'|"[^"\\\n]*")
+      | (?P<float>-?(?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?|-?\d+[eE][-+]?\d+)
+      | (?P<int>-?(?:0|[1-9]\d*))(?![\w.])
+      | (?P<const>True|False|None)\b
+      | (?P<punct>[\[\](){},:])
+    )""", re.VERBOSE)
+_CONSTANTS = {'True': True, 'False': False, 'None': None}
+_CLOSING = {'[': ']', '(': ')', '{': '}'}
+
+
+def _tokens(val: str):
+    pos, end = 0, len(val.rstrip())
+    while pos < end:
+        m = _TOKEN.match(val, pos)
+        if not m:
+            raise _Unsupported(val)
+        pos = m.end()
+        yield m.lastgroup, m.group(m.lastgroup)
+
+
+def _parse_tokens(val: str) -> Any:
+    """Parses strings without escapes, numbers, booleans, None, lists,
+    tuples and dicts from a token stream"""
+    tokens = _tokens(val)
+
+    def value(kind, text):
+        if kind == 'str':
+            return text[1:-1]
+        elif kind == 'int':
+            return int(text)
+        elif kind == 'float':
+            return float(text)
+        elif kind == 'const':
+            return _CONSTANTS[text]
+        elif text in _CLOSING:
+            return container(text)
+        raise _Unsupported(val)
+
+    def container(opening):
+        closing = _CLOSING[opening]
+        items, keys, trailing_comma = [], [], False
+        kind, text = next(tokens)
+        while text != closing or kind != 'punct':
+            if opening == '{':
+                keys.append(value(kind, text))
+                if next(tokens) != ('punct', ':'):
+                    raise _Unsupported(val)
+                kind, text = next(tokens)
+            items.append(value(kind, text))
+            kind, text = next(tokens)
+            trailing_comma = (kind, text) == ('punct', ',')
+            if trailing_comma:
+                kind, text = next(tokens)
+            elif text != closing:
+                raise _Unsupported(val)
+
+        if opening == '[':
+            return items
+        elif opening == '{':
+            return dict(zip(keys, items))
+        elif len(items) == 1 and not trailing_comma:
+            return items[0]
+        return tuple(items)
+
+    try:
+        result = value(*next(tokens))
+        for _ in tokens:
+            raise _Unsupported(val)
+    except (StopIteration, TypeError):
+        # truncated values or unhashable dict keys
+        raise _Unsupported(val)
+    return result
+
+
+def _clone(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {k: _clone(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_clone(item) for item in obj]
+    elif isinstance(obj, tuple):
+        return tuple(_clone(item) for item in obj)
+    return obj
+
+
+def _reject_constant(name: str):
+    raise ValueError(name)
+
+
+class LiteralParser:
+    """Parses Python literals (strings, numbers, booleans, None and nested
+    lists, tuples and dicts) faster than ast.literal_eval
+
+    JSON documents are handed to the json module first, values within
+    the restricted subset above are then tokenized by a single regular
+    expression and anything else falls back to ast.literal_eval.
+
+    Parsed values are cached by digest so that re-reading a large value
+    does not parse it again. The cache is bounded both in number of
+    entries and in total length of the cached values; cached containers
+    are copied before being returned. The cache is shared by all the
+    envvars of a process, hence guarded by a lock; values are parsed
+    outside of it.
+    """
+
+    def __init__(self, max_entries: int = 256,
+                 max_size: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _parse(self, val: str) -> Any:
+        if val.startswith(('[', '{', '"')):
+            try:
+                return json.loads(val, parse_constant=_reject_constant)
+            except ValueError:
+                pass
+        try:
+            return _parse_tokens(val)
+        except _Unsupported:
+            return literal_eval(val)
+
+    def __call__(self, val: str) -> Any:
+        if len(val) > self.max_size:
+            return self._parse(val)
+
+        key = blake2b(val.encode('utf-8', 'surrogatepass'),
+                      digest_size=16).digest()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        if entry is not None:
+            return _clone(entry[1])
+
+        result = self._parse(val)
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = (len(val), result)
+                self._size += len(val)
+            while len(self._cache) > self.max_entries \
+                    or self._size > self.max_size:
+                size, _ = self._cache.popitem(last=False)[1]
+                self._size -= size
+        return _clone(result)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._size = 0
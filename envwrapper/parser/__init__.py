@@ -1,5 +1,8 @@
 import re
 from .iface import EnvParserInterface
+from .ini import IniReader  # noqa: F401
+from .jsonstream import JSONObjectStream  # noqa: F401
+from .dotenv import DotEnvParser  # noqa: F401
 
 
 class SimpleParser(EnvParserInterface):
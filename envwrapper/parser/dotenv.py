@@ -0,0 +1,114 @@
+from typing import Iterator, Match, TextIO, Tuple
+import re
+
+
+from .iface import EnvParserInterface
+
+
+_BLANK = re.compile(r'[ \t\r\f\v]*(?:#[^\n]*)?(?:\n|\Z)')
+_SPACES = re.compile(r'[ \t]*')
+_COMMENT = re.compile(r'[ \t]#')
+_DOUBLE_QUOTED = re.compile(r'[^"\\]*')
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\', '$': '$'}
+
+
+class DotEnvParser(EnvParserInterface):
+    """Single pass tokenizer of the common dotenv grammar
+
+    Lines are KEY=value pairs, optionally prefixed with 'export'. Blank
+    lines and lines starting with '#' are skipped. Unquoted values end at
+    the end of the line or at a '#' preceded by whitespace and are
+    stripped. Single quoted values are taken literally, double quoted
+    values support the \\n, \\t, \\r, \\", \\\\ and \\$ escapes; both can span
+    several lines and be followed by a comment.
+
+    The whole file is scanned once, without backtracking. Malformed lines
+    raise a ValueError telling their line number.
+    """
+
+    @property
+    def value_chars(self):
+        return r'[^\n]'
+
+    @property
+    def pattern(self):
+        return r'[ \t]*(?:export[ \t]+)?' \
+               r'(?P<name>[A-Za-z_][A-Za-z0-9_.]*)[ \t]*='
+
+    def pre_match(self, line: str) -> str:
+        return line.rstrip('\n\r')
+
+    def post_match(self, match: Match) -> str:
+        return match['name']
+
+    def __call__(self, f: TextIO, *_, **__) -> Iterator[Tuple[str, str]]:
+        key = re.compile(self.pattern)
+        # fast path: unquoted values without comments
+        pair = re.compile(self.pattern + r'(?P<value>[^\n#"\']*)(?:\n|\Z)')
+        text = f.read()
+        pos, lineno = 0, 1
+        while pos < len(text):
+            m = pair.match(text, pos)
+            if m:
+                pos, lineno = m.end(), lineno + 1
+                yield self.post_match(m), m['value'].strip()
+                continue
+
+            blank = _BLANK.match(text, pos)
+            if blank:
+                if blank.end() == len(text):
+                    return
+                pos, lineno = blank.end(), lineno + 1
+                continue
+
+            m = key.match(text, pos)
+            if not m:
+                line = text[pos:].split('\n', 1)[0]
+                raise ValueError(f'Line {lineno}: expected KEY=value, '
+                                 f'got {self.pre_match(line)!r}')
+            name, pos = self.post_match(m), m.end()
+
+            start = _SPACES.match(text, pos).end()
+            quote = text[start:start + 1]
+            if quote in ('"', "'"):
+                value, pos = self._quoted(text, start, lineno)
+                lineno += text.count('\n', start, pos)
+                rest = _BLANK.match(text, pos)
+                if not rest:
+                    raise ValueError(
+                        f'Line {lineno}: unexpected characters after the '
+                        f'quoted value of {name}'
+                    )
+                pos = rest.end()
+            else:
+                eol = text.find('\n', pos)
+                eol = len(text) if eol < 0 else eol
+                comment = _COMMENT.search(text, pos, eol)
+                value = text[pos:comment.start() if comment else eol].strip()
+                pos = eol + 1
+            lineno += 1
+            yield name, value
+
+    @staticmethod
+    def _quoted(text: str, start: int, lineno: int) -> Tuple[str, int]:
+        """Returns the value of the string quoted at start and the position
+        following its closing quote"""
+        quote = text[start]
+        if quote == "'":
+            end = text.find("'", start + 1)
+            if end < 0:
+                raise ValueError(f'Line {lineno}: unterminated quoted value')
+            return text[start + 1:end], end + 1
+
+        chunks = []
+        pos = start + 1
+        while True:
+            end = _DOUBLE_QUOTED.match(text, pos).end()
+            chunks.append(text[pos:end])
+            if end == len(text) or end + 1 == len(text) and text[end] == '\\':
+                raise ValueError(f'Line {lineno}: unterminated quoted value')
+            if text[end] == '"':
+                return ''.join(chunks), end + 1
+            escaped = text[end + 1]
+            chunks.append(_ESCAPES.get(escaped, '\\' + escaped))
+            pos = end + 2
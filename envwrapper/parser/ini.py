@@ -0,0 +1,61 @@
+from typing import Dict, Iterator, List, Sequence, TextIO, Tuple
+
+
+class IniReader:
+    """Streams (section, key, value) triples out of an INI file
+
+    Unlike configparser, nothing is kept in memory but the current value,
+    values are never interpolated and sections do not inherit the keys of
+    the default section. Keys before the first section header belong to
+    the default section. Indented lines continue the previous value.
+    """
+
+    def __init__(self, default_section: str = 'DEFAULT',
+                 delimiters: Sequence[str] = ('=', ':'),
+                 comment_prefixes: Sequence[str] = ('#', ';')):
+        self.default_section = default_section
+        self.delimiters = tuple(delimiters)
+        self.comment_prefixes = tuple(comment_prefixes)
+
+    def _split(self, line: str, lineno: int) -> Tuple[str, str]:
+        positions = [
+            pos for pos in (line.find(d) for d in self.delimiters)
+            if pos > 0
+        ]
+        if not positions:
+            raise ValueError(f'Line {lineno}: expected a key and a value, '
+                             f'got {line!r}')
+        pos = min(positions)
+        delimiter = next(d for d in self.delimiters
+                         if line.startswith(d, pos))
+        return line[:pos].strip(), line[pos + len(delimiter):].strip()
+
+    def __call__(self, f: TextIO) -> Iterator[Tuple[str, str, str]]:
+        section, key, value = self.default_section, None, None
+        for lineno, line in enumerate(f, 1):
+            stripped = line.strip()
+            if not stripped or stripped.startswith(self.comment_prefixes):
+                continue
+
+            if line[0].isspace() and key is not None:
+                value = f'{value}\n{stripped}' if value else stripped
+                continue
+
+            if key is not None:
+                yield section, key, value
+                key = None
+
+            if stripped.startswith('[') and stripped.endswith(']'):
+                section = stripped[1:-1].strip()
+            else:
+                key, value = self._split(stripped, lineno)
+
+        if key is not None:
+            yield section, key, value
+
+    def sections(self, f: TextIO) -> Dict[str, List[Tuple[str, str]]]:
+        """Groups (key, value) pairs by section, in file order"""
+        sections = {self.default_section: []}
+        for section, key, value in self(f):
+            sections.setdefault(section, []).append((key, value))
+        return sections
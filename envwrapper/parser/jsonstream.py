@@ -0,0 +1,132 @@
+from json.decoder import scanstring
+from typing import Any, Iterator, TextIO, Tuple
+import json
+import re
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# member names without escape sequences, up to the start of the value
+_NAME = re.compile(r'[ \t\n\r]*"([^"\\\x00-\x1f]*)"[ \t\n\r]*:[ \t\n\r]*')
+# what may follow a valid number prefix, as in '1.' or '2e' of '1.5', '2e3'
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+class JSONObjectStream:
+    """Streams the members of a JSON object read from a file in chunks
+
+    Top-level members are yielded as ('', name, value) triples, except
+    for object values which are streamed member by member as
+    (name, member name, value) triples, i.e. as bundles. Only the chunk
+    being parsed and the value being decoded are kept in memory.
+    """
+
+    def __init__(self, decoder: json.JSONDecoder = None,
+                 chunk_size: int = 64 * 1024):
+        self.decoder = decoder or json.JSONDecoder()
+        self.chunk_size = chunk_size
+
+    def __call__(self, f: TextIO) -> Iterator[Tuple[str, str, Any]]:
+        return _Reader(f, self.decoder, self.chunk_size).members()
+
+
+class _Reader:
+
+    def __init__(self, f: TextIO, decoder: json.JSONDecoder,
+                 chunk_size: int):
+        self._f = f
+        self._decoder = decoder
+        self._chunk_size = chunk_size
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self, size: int) -> bool:
+        """Appends at least size characters to the buffer, dropping what
+        has already been parsed; returns False at end of file"""
+        chunk = self._f.read(max(size, self._chunk_size))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skips whitespace, returns the next character or '' at EOF"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read(self._chunk_size):
+                return ''
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                f'Expecting one of {chars!r}', self._buf, self._pos
+            )
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        char = self._peek()
+        while True:
+            try:
+                if char == '"':
+                    value, end = scanstring(self._buf, self._pos + 1,
+                                            self._decoder.strict)
+                else:
+                    value, end = self._decoder.raw_decode(self._buf,
+                                                          self._pos)
+                # a number running to the end of the buffer may be
+                # truncated, even if a prefix of it already decodes
+                if char in '-0123456789' and not self._eof:
+                    tail = _NUMBER_TAIL.match(self._buf, end).end()
+                else:
+                    tail = end
+                if tail < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # grow geometrically to keep large values linear to parse
+            self._read(len(self._buf) - self._pos)
+
+    def _object(self) -> Iterator[Tuple[str, Any, bool]]:
+        """Yields (name, value, is_object) for each member of the object
+        starting at the current position, object values are not decoded"""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+
+        while True:
+            m = _NAME.match(self._buf, self._pos)
+            if m and m.end() < len(self._buf):
+                name, self._pos = m.group(1), m.end()
+            else:
+                if self._peek() != '"':
+                    self._expect('"')
+                name = self._value()
+                self._expect(':')
+            if self._peek() == '{':
+                yield name, None, True
+            else:
+                yield name, self._value(), False
+            if self._expect(',}') == '}':
+                return
+
+    def members(self) -> Iterator[Tuple[str, str, Any]]:
+        for name, value, is_object in self._object():
+            if is_object:
+                for member, member_value, nested in self._object():
+                    if nested:
+                        member_value = self._value()
+                    yield name, member, member_value
+            else:
+                yield '', name, value
+
+        if self._peek():
+            raise json.JSONDecodeError('Extra data', self._buf, self._pos)
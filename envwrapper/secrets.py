@@ -0,0 +1,78 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+
+
+def strip_newline(content: str) -> str:
+    """Drops the trailing newline editors and 'echo' leave in files"""
+    if content.endswith('\r\n'):
+        return content[:-2]
+    if content.endswith('\n'):
+        return content[:-1]
+    return content
+
+
+class SecretFileCache:
+    """Contents of secret files, as mounted by container platforms, keyed
+    by path
+
+    A file is read once, on first lookup; later lookups never touch the
+    file system. refresh() stats the cached files in bulk and reads again
+    those whose inode, modification time or size has changed.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Tuple[int, int, int], str]] = dict()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Incremented each time a refresh or clear drops or changes the
+        contents of cached files"""
+        return self._generation
+
+    @staticmethod
+    def _key(st: os.stat_result) -> Tuple[int, int, int]:
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self, path: str) -> str:
+        with open(path) as f:
+            key = self._key(os.fstat(f.fileno()))
+            content = strip_newline(f.read())
+        self._entries[path] = (key, content)
+        return content
+
+    def read(self, path: str) -> str:
+        entry = self._entries.get(path)
+        if entry is None:
+            return self._load(path)
+        return entry[1]
+
+    def refresh(self, paths: Optional[Iterable[str]] = None) -> List[str]:
+        """Reads again the files that changed among paths, or among all
+        cached files, returns their paths. Files that disappeared are
+        dropped from the cache."""
+        changed = []
+        for path in list(self._entries if paths is None else paths):
+            entry = self._entries.get(path)
+            try:
+                key = self._key(os.stat(path))
+            except OSError:
+                if self._entries.pop(path, None) is not None:
+                    changed.append(path)
+                continue
+            if entry is None or entry[0] != key:
+                self._load(path)
+                changed.append(path)
+        if changed:
+            self._generation += 1
+        return changed
+
+    def clear(self):
+        self._entries.clear()
+        self._generation += 1
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
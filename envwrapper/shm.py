@@ -0,0 +1,192 @@
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, Mapping, Optional
+from zlib import crc32
+import os
+import struct
+
+
+from .base import EnvWrapper
+
+
+def _registers_segments() -> bool:
+    """Whether SharedMemory registers the segments it opens with the
+    resource tracker, as it does for POSIX shared memory only. The flag
+    telling so is private to multiprocessing, hence the fallback."""
+    return getattr(shared_memory, '_USE_POSIX', os.name == 'posix')
+
+
+class SharedEnvSnapshot(Mapping):
+    """A read-only mapping of resolved envvars stored once in a
+    multiprocessing.shared_memory segment
+
+    The master process creates the snapshot from a resolved EnvWrapper,
+    workers attach to it by name (or simply inherit it after a fork) and
+    bind their own wrapper to it. Raw values are never copied into the
+    workers until they are actually read.
+
+    Segment layout:
+        header  | magic (4 bytes), number of entries, number of slots
+        slots   | open addressing table keyed by the CRC32 of the keys,
+                | holds entry index + 1 (0 marks an empty slot)
+        entries | key offset, key length, value offset, value length
+        blob    | keys and values, UTF-8 encoded
+    """
+
+    MAGIC = b'EWS1'
+    ENCODING = 'utf-8'
+    ERRORS = 'surrogateescape'
+
+    _HEADER = struct.Struct('<4sII')
+    _SLOT = struct.Struct('<I')
+    _ENTRY = struct.Struct('<IIII')
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self._shm = shm
+        self._owner = owner
+        # the snapshot is never written once created
+        self._buf = shm.buf.toreadonly()
+        magic, self._size, self._slots = \
+            self._HEADER.unpack_from(self._buf, 0)
+        if magic != self.MAGIC:
+            self._buf.release()
+            raise ValueError(
+                f'Shared memory segment {shm.name} does not hold '
+                f'an envvar snapshot'
+            )
+        self._entries = self._HEADER.size + self._SLOT.size * self._slots
+        self._decoded = dict()
+
+    @classmethod
+    def create(cls, env: EnvWrapper,
+               name: Optional[str] = None) -> 'SharedEnvSnapshot':
+        """Serializes the raw values of env, as given by EnvWrapper.collect,
+        into a new shared memory segment"""
+        items = [
+            (k.encode(cls.ENCODING, cls.ERRORS),
+             v.encode(cls.ENCODING, cls.ERRORS))
+            for k, v in env.collect().items()
+        ]
+        slots = 1
+        while slots < 2 * len(items):
+            slots <<= 1
+        entries = cls._HEADER.size + cls._SLOT.size * slots
+        table_size = entries + cls._ENTRY.size * len(items)
+        blob_size = sum(len(k) + len(v) for k, v in items)
+
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=table_size + blob_size
+        )
+        try:
+            buf = shm.buf
+            buf[:entries] = bytes(entries)
+            cls._HEADER.pack_into(buf, 0, cls.MAGIC, len(items), slots)
+
+            offset = table_size
+            for index, (key, val) in enumerate(items):
+                key_offset = offset
+                buf[offset:offset + len(key)] = key
+                offset += len(key)
+                val_offset = offset
+                buf[offset:offset + len(val)] = val
+                offset += len(val)
+                cls._ENTRY.pack_into(
+                    buf, entries + index * cls._ENTRY.size,
+                    key_offset, len(key), val_offset, len(val)
+                )
+
+                slot = crc32(key) & (slots - 1)
+                while cls._SLOT.unpack_from(
+                        buf, cls._HEADER.size + slot * cls._SLOT.size)[0]:
+                    slot = (slot + 1) & (slots - 1)
+                cls._SLOT.pack_into(
+                    buf, cls._HEADER.size + slot * cls._SLOT.size, index + 1
+                )
+            del buf
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedEnvSnapshot':
+        """Attaches to a snapshot created by another process"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # pragma: nocover
+            # track is only available as of Python 3.13: otherwise the
+            # resource tracker of this process would destroy the segment
+            # when it exits
+            shm = shared_memory.SharedMemory(name=name)
+            if _registers_segments():
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _entry(self, index: int):
+        return self._ENTRY.unpack_from(
+            self._buf, self._entries + index * self._ENTRY.size
+        )
+
+    def _find(self, key: bytes) -> int:
+        mask = self._slots - 1
+        slot = crc32(key) & mask
+        while True:
+            index, = self._SLOT.unpack_from(
+                self._buf, self._HEADER.size + slot * self._SLOT.size
+            )
+            if not index:
+                raise KeyError(key)
+            key_offset, key_len, _, _ = self._entry(index - 1)
+            if key_len == len(key) and \
+                    self._buf[key_offset:key_offset + key_len] == key:
+                return index - 1
+            slot = (slot + 1) & mask
+
+    def raw(self, key: str) -> memoryview:
+        """Returns the UTF-8 encoded value of key as a zero-copy,
+        read-only view of the shared segment"""
+        try:
+            index = self._find(key.encode(self.ENCODING, self.ERRORS))
+        except KeyError:
+            raise KeyError(key) from None
+        _, _, val_offset, val_len = self._entry(index)
+        return self._buf[val_offset:val_offset + val_len]
+
+    def __getitem__(self, key: str) -> str:
+        if key not in self._decoded:
+            view = self.raw(key)
+            try:
+                self._decoded[key] = str(view, self.ENCODING, self.ERRORS)
+            finally:
+                view.release()
+        return self._decoded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._size):
+            key_offset, key_len, _, _ = self._entry(index)
+            yield str(self._buf[key_offset:key_offset + key_len],
+                      self.ENCODING, self.ERRORS)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def close(self):
+        """Detaches this process from the segment, the owner also
+        destroys it"""
+        self._decoded.clear()
+        self._buf.release()
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> 'SharedEnvSnapshot':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
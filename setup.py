@@ -14,10 +14,14 @@ setup(
     version="0.1",
     description='Environment variables for mere developers',
     long_description=readme,
-    packages=find_packages(exclude=('tests*', )),
+    packages=find_packages(exclude=('tests*', 'benchmarks*')),
+    entry_points={
+        'console_scripts': ['envwrapper = envwrapper.cli:main'],
+    },
     author='Sébastien LOUCHART',
     author_email='sebastien.louchart@gmail.com',
     license='MIT',
+    python_requires='>=3.8',
     tests_require=['pytest', 'pytest-cov'],
     classifiers=[
         'Development Status :: 3 - Alpha',
@@ -25,8 +29,10 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
         'Programming Language :: Python :: 3 :: Only',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Programming Language :: Python :: Implementation :: CPython',
         'Topic :: Software Development',
         'Topic :: Utilities'
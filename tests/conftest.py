@@ -0,0 +1,14 @@
+from envwrapper.discovery import EnvironIndex
+import os
+
+
+import pytest
+
+
+@pytest.fixture()
+def os_env():
+    old_env = os.environ.copy()
+    yield os.environ
+    os.environ.clear()
+    os.environ.update(old_env)
+    EnvironIndex.invalidate()
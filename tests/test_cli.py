@@ -0,0 +1,72 @@
+from envwrapper.cli import main
+import json
+
+
+import pytest
+
+
+@pytest.fixture()
+def source(tmp_path, os_env):
+    os_env['HOST'] = 'from-environ'
+    path = tmp_path / 'config.env'
+    path.write_text('HOST=example.org\nPORT=8080\n')
+    return path
+
+
+def test_convert(source, tmp_path, capsys):
+    output = tmp_path / 'config.json'
+    assert main(['convert', str(source), str(output)]) == 0
+    assert json.loads(output.read_text()) == {
+        'host': 'example.org', 'port': '8080'
+    }
+
+    assert main(['convert', str(output), '--to', 'ini']) == 0
+    assert capsys.readouterr().out == \
+        '[DEFAULT]\nhost = example.org\nport = 8080\n\n'
+
+
+def test_convert_with_environ(source, capsys):
+    assert main(['convert', str(source), '-', '--to', 'json',
+                 '--environ']) == 0
+    assert json.loads(capsys.readouterr().out)['host'] == 'from-environ'
+
+
+def test_convert_stdin(source, capsys, monkeypatch):
+    monkeypatch.setattr('sys.stdin', source.open())
+    assert main(['convert', '-', '--from', 'env', '--to', 'env']) == 0
+    assert capsys.readouterr().out == 'HOST=example.org\nPORT=8080\n'
+
+
+def test_collect(os_env, capsys):
+    os_env['CLI_TEST_PORT'] = '80'
+    assert main(['collect', 'CLI_TEST_']) == 0
+    assert capsys.readouterr().out == 'CLI_TEST_PORT=80\n'
+
+
+def test_show(source, os_env, capsys):
+    assert main(['show', str(source)]) == 0
+    assert capsys.readouterr().out == "HOST='example.org'\nPORT=8080\n"
+
+    os_env['CLI_TEST_DEBUG'] = 'true'
+    assert main(['show', '--prefix', 'CLI_TEST_']) == 0
+    assert capsys.readouterr().out == "DEBUG='true'\n"
+
+
+def test_timing(source, capsys):
+    assert main(['--timing', 'show', str(source)]) == 0
+    report = capsys.readouterr().err
+    assert [line.split()[0] for line in report.splitlines()] == [
+        'parse', 'decode', 'resolve', 'total'
+    ]
+
+
+@pytest.mark.parametrize('argv', [
+    ['show'],
+    ['convert', 'missing.env'],
+    ['convert', 'malformed.ini'],
+])
+def test_errors(argv, tmp_path, capsys, monkeypatch):
+    (tmp_path / 'malformed.ini').write_text('[SECTION]\nno delimiter\n')
+    monkeypatch.chdir(tmp_path)
+    assert main(argv) == 1
+    assert capsys.readouterr().err.startswith('envwrapper: ')
@@ -0,0 +1,98 @@
+from envwrapper import ConfigurationError, EnvWrapper
+from envwrapper.directory import DirectorySource
+import os
+
+
+import pytest
+
+
+def write(path, content):
+    path.write_text(content)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000))
+
+
+@pytest.fixture()
+def configmap(tmp_path, os_env):
+    for name in ('HOST', 'PORT', 'DEBUG', 'USER', 'TIMEOUT', 'NEW'):
+        os_env.pop(name, None)
+    write(tmp_path / 'host', 'example.org\n')
+    write(tmp_path / 'port', '8080')
+    write(tmp_path / '.hidden', 'x')
+    (tmp_path / 'db').mkdir()
+    write(tmp_path / 'db' / 'user', 'app')
+    write(tmp_path / 'db' / 'timeout', '1.5')
+    (tmp_path / '..data').mkdir()
+    write(tmp_path / '..data' / 'host', 'ignored')
+    return tmp_path
+
+
+def test_scan(configmap):
+    source = DirectorySource(configmap)
+    assert sorted(source.scan()) == [
+        ('', 'host'), ('', 'port'), ('db', 'timeout'), ('db', 'user')
+    ]
+
+
+@pytest.mark.parametrize('concurrent', [False, True])
+def test_from_directory(configmap, concurrent):
+    env = EnvWrapper.from_directory(configmap, concurrent=concurrent)
+    assert env.HOST == 'example.org'
+    assert env.PORT == 8080
+    assert env.DB == {'user': 'app', 'timeout': 1.5}
+    assert env.refresh_directory() == []
+
+
+def test_refresh_directory(configmap):
+    env = EnvWrapper.from_directory(configmap, lazy=True)
+    write(configmap / 'port', '9090')
+    write(configmap / 'debug', 'true')
+    (configmap / 'db' / 'timeout').unlink()
+
+    assert sorted(env.refresh_directory()) == ['DEBUG', 'PORT', 'TIMEOUT']
+    assert env.PORT == 9090
+    assert env.DEBUG is True
+    assert 'TIMEOUT' not in env
+    assert env.DB == {'user': 'app'}
+
+    (configmap / 'db' / 'user').unlink()
+    assert env.refresh_directory() == ['USER']
+    assert 'DB' not in env
+
+
+def test_file_names(configmap, os_env):
+    os_env.pop('LOG_LEVEL', None)
+    os_env.pop('APP_NAME', None)
+    write(configmap / 'log-level', 'debug')
+    (configmap / 'db.replica').mkdir()
+    write(configmap / 'db.replica' / 'app.name', 'svc')
+    env = EnvWrapper.from_directory(configmap)
+    assert env.LOG_LEVEL == 'debug'
+    assert env.DB_REPLICA == {'app_name': 'svc'}
+
+    (configmap / 'log-level').unlink()
+    assert env.refresh_directory() == ['LOG_LEVEL']
+    assert 'LOG_LEVEL' not in env
+
+
+@pytest.mark.parametrize('name', ['1', '_', '2-3', 'a b'])
+def test_file_names_errors(configmap, name):
+    env = EnvWrapper.from_directory(configmap)
+    write(configmap / 'port', '9090')
+    write(configmap / name, 'x')
+    with pytest.raises(ConfigurationError) as e:
+        EnvWrapper.from_directory(configmap)
+    assert str(e.value).startswith(
+        f'Cannot name an envvar after {configmap / name}: '
+    )
+    with pytest.raises(ConfigurationError):
+        env.refresh_directory()
+    assert env.PORT == 8080
+
+    (configmap / name).unlink()
+    assert env.refresh_directory() == ['PORT']
+
+
+def test_refresh_requires_a_directory():
+    with pytest.raises(ConfigurationError):
+        EnvWrapper().refresh_directory()
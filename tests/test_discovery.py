@@ -0,0 +1,84 @@
+from envwrapper import EnvHub, EnvWrapper
+from envwrapper.discovery import EnvironIndex
+import gc
+
+
+def test_index_prefix():
+    index = EnvironIndex({'APP_A': '', 'APP_B': '', 'APQ': '', 'APPX': '',
+                          'OTHER': ''})
+    assert index.with_prefix('APP_') == ['APP_A', 'APP_B']
+    assert index.with_prefix('APP') == ['APPX', 'APP_A', 'APP_B']
+    assert index.with_prefix('ZZZ') == []
+    assert index.matching('AP?_*') == ['APP_A', 'APP_B']
+    assert index.matching('*Q') == ['APQ']
+
+
+def test_shared_index(os_env):
+    os_env['MY_APP_PORT'] = '80'
+    first = EnvironIndex.shared()
+    assert EnvironIndex.shared() is first
+    os_env['MY_APP_HOST'] = 'localhost'
+    second = EnvironIndex.shared()
+    assert second is not first
+    assert second.with_prefix('MY_APP_') == ['MY_APP_HOST', 'MY_APP_PORT']
+    assert EnvironIndex.shared(refresh=True) is not second
+
+
+def test_shared_index_same_size(os_env):
+    os_env.update({'MYAPP_A': '1', 'OTHER_Z': '2'})
+    assert set(EnvWrapper.from_prefix('MYAPP_').keys()) == {'A'}
+    del os_env['OTHER_Z']
+    os_env['MYAPP_B'] = '3'
+    # same number of names: the index is not rebuilt unless asked to
+    assert set(EnvWrapper.from_prefix('MYAPP_').keys()) == {'A'}
+    assert set(EnvWrapper.from_prefix('MYAPP_', refresh=True).keys()) == \
+        {'A', 'B'}
+    assert set(EnvWrapper.from_prefix('MYAPP_').keys()) == {'A', 'B'}
+
+
+def test_shared_index_generation():
+    source = {'APP_A': '1'}
+    hub = EnvHub(source)
+    first = EnvironIndex.shared(hub)
+    assert EnvironIndex.shared(hub) is first
+    source['APP_B'] = source.pop('APP_A')
+    hub.refresh()
+    assert EnvironIndex.shared(hub).with_prefix('APP_') == ['APP_B']
+
+
+def test_shared_index_references():
+    environ = {'APP_A': '1'}
+    assert EnvironIndex.shared(environ) is not EnvironIndex.shared(environ)
+    assert id(environ) not in EnvironIndex._shared
+
+    hub = EnvHub(environ)
+    EnvironIndex.shared(hub)
+    assert id(hub) in EnvironIndex._shared
+    key = id(hub)
+    del hub
+    gc.collect()
+    assert key not in EnvironIndex._shared
+
+
+def test_from_prefix(os_env):
+    os_env.update({
+        'MY_APP_PORT': '8080', 'MY_APP_ADMIN_PORT': '9090',
+        'MY_APP_DEBUG': 'yes', 'MY_APP_NAME': 'svc', 'MY_APP_lower': 'x',
+        'OTHER_PORT': '1'
+    })
+    env = EnvWrapper.from_prefix('MY_APP_', rules={
+        '*PORT': int, 'DEBUG': {'convert': bool, 'default': 'no'}
+    })
+    assert set(env.keys()) == {'PORT', 'ADMIN_PORT', 'DEBUG', 'NAME'}
+    assert env.PORT == 8080
+    assert env.ADMIN_PORT == 9090
+    assert env.DEBUG is True
+    assert env.NAME == 'svc'
+    assert env.collect()['MY_APP_NAME'] == 'svc'
+
+
+def test_from_pattern_with_environ():
+    environ = {'DB_HOST': 'db', 'DB_PORT': '5432', 'CACHE_HOST': 'redis'}
+    env = EnvWrapper.from_pattern('*_HOST', environ=environ)
+    assert set(env.keys()) == {'DB_HOST', 'CACHE_HOST'}
+    assert env.DB_HOST == 'db'
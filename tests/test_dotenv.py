@@ -0,0 +1,80 @@
+from envwrapper import EnvWrapper
+from envwrapper.parser import DotEnvParser, SimpleParser
+import io
+
+
+import pytest
+
+
+DOTENV = '''
+# comment
+export EXPORTED=1
+PLAIN = some value   # trailing comment
+HASH=value#not-a-comment
+EMPTY=
+EMPTY_COMMENT= # comment
+SINGLE='literal \\n $HOME # kept'
+DOUBLE="tab\\there \\"quoted\\" \\\\ \\$HOME \\q"
+MULTI="first
+second" # comment
+MULTI_SINGLE='a
+b'
+dotted.key=x
+export=not a prefix
+'''
+
+
+def parse(text):
+    return list(DotEnvParser()(io.StringIO(text)))
+
+
+def test_grammar():
+    assert dict(parse(DOTENV)) == {
+        'EXPORTED': '1',
+        'PLAIN': 'some value',
+        'HASH': 'value#not-a-comment',
+        'EMPTY': '',
+        'EMPTY_COMMENT': '',
+        'SINGLE': 'literal \\n $HOME # kept',
+        'DOUBLE': 'tab\there "quoted" \\ $HOME \\q',
+        'MULTI': 'first\nsecond',
+        'MULTI_SINGLE': 'a\nb',
+        'dotted.key': 'x',
+        'export': 'not a prefix',
+    }
+
+
+def test_no_trailing_newline():
+    assert parse('A=1\nB="2"') == [('A', '1'), ('B', '2')]
+    assert parse('') == []
+    assert parse('\n\n# only comments') == []
+
+
+@pytest.mark.parametrize('text, message', [
+    ('A=1\nnot a pair\n', "Line 2: expected KEY=value, got 'not a pair'"),
+    ('A="1\n2', 'Line 1: unterminated quoted value'),
+    ("A='1", 'Line 1: unterminated quoted value'),
+    ('A="1\\', 'Line 1: unterminated quoted value'),
+    ('A="1\n2" 3\n', 'Line 2: unexpected characters after the quoted '
+                     'value of A'),
+])
+def test_errors(text, message):
+    with pytest.raises(ValueError) as e:
+        parse(text)
+    assert str(e.value) == message
+
+
+def test_same_pairs_as_simple_parser():
+    text = 'A=1\n  B = two words \nC=3\n'
+    assert parse(text) == list(SimpleParser()(io.StringIO(text)))
+
+
+def test_from_source_file(os_env):
+    os_env.pop('PORT', None)
+    os_env.pop('NAME', None)
+    env = EnvWrapper.from_source_file(
+        io.StringIO('export PORT=8080\nNAME="my app" # quoted\n'),
+        parser=DotEnvParser
+    )
+    assert env.PORT == 8080
+    assert env.NAME == 'my app'
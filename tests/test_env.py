@@ -1,7 +1,16 @@
-from envwrapper import ConfigurationError, EnvWrapper, EnvVar
+from envwrapper import ConfigurationError, EnvHub, EnvWrapper, EnvVar
+from envwrapper.base import EnvRecord
+from envwrapper.codecs import EnvWrapperDecoder
+from envwrapper.parser import IniReader
 import os
 import json
 import io
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import gc
+import pickle
+import weakref
 
 
 import pytest
@@ -11,14 +20,6 @@ class Factory:
     pass
 
 
-@pytest.fixture()
-def os_env():
-    old_env = os.environ.copy()
-    yield os.environ
-    os.environ.clear()
-    os.environ.update(old_env)
-
-
 def test_init_dict():
     env = EnvWrapper(
         VAR={}
@@ -607,3 +608,451 @@ def test_iter_sub_cast_literal_dict(os_env):
     env = EnvWrapper(VALUES=EnvVar(convert=dict, sub_cast=int))
     os.environ['VALUES'] = "{'foo': '1', 'bar': '2', 'spam': '3'}"
     assert env.VALUES == {'bar': 2, 'foo': 1, 'spam': 3}
+
+
+def test_to_array(os_env):
+    env = EnvWrapper(
+        PORTS=EnvVar(convert=EnvVar.to_array('H', sep=',')),
+        WEIGHTS=EnvVar(convert=EnvVar.to_array('d', sep=' '), default='')
+    )
+    os_env['PORTS'] = '8000, 8001,8002'
+    ports = env.PORTS
+    assert isinstance(ports, array)
+    assert ports.typecode == 'H'
+    assert ports.tolist() == [8000, 8001, 8002]
+    assert len(env.WEIGHTS) == 0
+    os_env['WEIGHTS'] = '0.5 0.25'
+    assert env.WEIGHTS.tolist() == [0.5, 0.25]
+
+
+def test_to_array_error_position(os_env):
+    env = EnvWrapper(PORTS=EnvVar(convert=EnvVar.to_array('H')))
+    os_env['PORTS'] = '8000,80o1,8002'
+    with pytest.raises(ValueError) as e:
+        _ = env.PORTS
+    assert str(e.value) == "Invalid array element at position 1: " \
+                           "'80o1' (typecode 'H')"
+    os_env['PORTS'] = '8000,8001,70000'
+    with pytest.raises(OverflowError) as e:
+        _ = env.PORTS
+    assert str(e.value).startswith('Invalid array element at position 2')
+
+
+def test_to_array_bad_typecode():
+    with pytest.raises(ValueError):
+        EnvVar.to_array('u')
+
+
+CONFIG = """[general]
+var = foo
+FLAG = off
+
+[settings]
+var1 = bar
+var2 = 42
+
+[other]
+var3 = %(var)s
+  continued
+"""
+
+
+def test_read_from_config_lazy():
+    env = EnvWrapper.from_config(io.StringIO(CONFIG),
+                                 default_section='general',
+                                 bool_values=('off', 'on'), lazy=True)
+    assert not env._vars
+    assert set(env._pending) == {'SETTINGS', 'OTHER'}
+    assert env.SETTINGS == {'var1': 'bar', 'var2': 42}
+    assert set(env._pending) == {'OTHER'}
+    assert env.FLAG is False
+    assert env.VAR3 == 'foo\ncontinued'
+    assert not env._pending
+    assert set(env.keys()) == {'VAR', 'FLAG', 'SETTINGS', 'VAR1', 'VAR2',
+                               'OTHER', 'VAR3'}
+
+
+def test_read_from_config_lazy_as_eager():
+    config = '[DEFAULT]\nbase = /srv\n[paths]\nlogs = %(base)s/logs\n'
+    eager = EnvWrapper.from_config(io.StringIO(config))
+    lazy = EnvWrapper.from_config(io.StringIO(config), lazy=True)
+    assert lazy.PATHS == eager.PATHS == {'base': '/srv',
+                                         'logs': '/srv/logs'}
+    assert dict(lazy.items()) == dict(eager.items())
+
+    raw = EnvWrapper.from_config(io.StringIO(config), lazy=True,
+                                 interpolation=None)
+    assert raw.LOGS == '%(base)s/logs'
+
+    env = EnvWrapper.from_config(io.StringIO(CONFIG), parser_cls=IniReader,
+                                 lazy=True)
+    assert env.VAR3 == '%(var)s\ncontinued'
+
+
+def test_read_from_config_lazy_keys():
+    env = EnvWrapper.from_config(io.StringIO(CONFIG),
+                                 default_section='general', lazy=True)
+    assert 'VAR1' in env
+    assert set(env._pending) == {'OTHER'}
+    assert 'YADA' not in env
+    assert set(env._pending) == {'OTHER'}
+    assert env.get('VAR3') == 'foo\ncontinued'
+    assert not env._pending
+
+
+def test_read_from_config_lazy_threads():
+    config = ''.join(f'[section{i}]\nvar{i} = {i}\n' for i in range(50))
+    env = EnvWrapper.from_config(io.StringIO(config), lazy=True)
+
+    def read(i):
+        return env.get(f'VAR{i}')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(read, range(50))) == list(range(50))
+    assert not env._pending
+
+
+def test_read_from_config_streaming():
+    env = EnvWrapper.from_config(io.StringIO(CONFIG),
+                                 default_section='general',
+                                 bool_values=('off', 'on'),
+                                 parser_cls=IniReader)
+    assert not env._pending
+    assert env.FLAG is False
+    assert env.VAR2 == 42
+    assert env.OTHER == {'var3': '%(var)s\ncontinued'}
+
+
+def test_ini_reader_errors():
+    reader = IniReader()
+    assert list(reader(io.StringIO('; comment\nkey: a = b\n'))) == [
+        ('DEFAULT', 'key', 'a = b')
+    ]
+    with pytest.raises(ValueError) as e:
+        list(reader(io.StringIO('[section]\ngarbage\n')))
+    assert str(e.value) == "Line 2: expected a key and a value, " \
+                           "got 'garbage'"
+
+
+def test_lazy_decoder(os_env):
+    f = io.StringIO('{"flag": "false", "workers": "4", '
+                    '"settings": {"var1": "bar", "ratio": "0.5"}}')
+    env = EnvWrapper.from_json(f, lazy=True)
+    assert all(isinstance(var, EnvRecord) for _, var in env.vars)
+    assert set(env.keys()) == {'FLAG', 'WORKERS', 'SETTINGS', 'VAR1',
+                               'RATIO'}
+    out = io.StringIO()
+    env.to_json(out)
+    assert json.loads(out.getvalue()) == {
+        'flag': 'false', 'workers': '4',
+        'settings': {'var1': 'bar', 'ratio': '0.5'}
+    }
+    assert env.collect() == {'FLAG': 'false', 'WORKERS': '4',
+                             'VAR1': 'bar', 'RATIO': '0.5'}
+    assert env._vars['WORKERS']._var is None
+
+    os_env['WORKERS'] = '8'
+    assert env.WORKERS == 8
+    assert env.SETTINGS == {'var1': 'bar', 'ratio': 0.5}
+    assert env.FLAG is False
+    assert isinstance(env._vars['WORKERS'].materialize(), EnvVar)
+
+
+def test_lazy_decoder_releases_itself():
+    decoder = EnvWrapperDecoder(lazy=True)
+    env = decoder([('workers', '4'), ('name', 'svc')], [])
+    ref = weakref.ref(decoder)
+    del decoder
+    gc.collect()
+    assert ref() is None
+    assert env.WORKERS == 4
+    assert pickle.loads(pickle.dumps(env)).WORKERS == 4
+
+
+def test_lazy_decoder_bind():
+    f = io.StringIO('workers=4\nname=svc\n')
+    env = EnvWrapper.from_source_file(f, lazy=True)
+    assert env.NAME == 'svc'
+    env.bind({'WORKERS': '16', 'NAME': 'api'})
+    assert env.WORKERS == 16
+    assert env.NAME == 'api'
+
+
+def test_resolution_table(os_env):
+    calls = []
+
+    def spy(val):
+        calls.append(val)
+        return val
+
+    env = EnvWrapper(
+        VAR=EnvVar(default='foo'),
+        FLAG=EnvVar(convert=bool, default='no', bundle='SETTINGS',
+                    preprocessor=spy),
+        PROXIED=EnvVar(proxy='YADA', default='spam', bundle='SETTINGS')
+    )
+    table = env.resolution_table()
+    assert len(table) == 3
+    assert table.os_names == ['VAR', 'FLAG', 'YADA']
+    assert table.raw_values == ['foo', 'no', 'spam']
+    assert table.bools == [None, False, None]
+    assert table.bundle_rows[0][0] == 'SETTINGS'
+    assert table.bundle_rows[0][2] == [1, 2]
+    assert calls == ['no']
+
+    f = io.StringIO()
+    env.to_config(f, table=table)
+    env.to_json(io.StringIO(), table=table)
+    env.to_source_file(io.StringIO(), table=table)
+    assert env.collect(table) == {'VAR': 'foo', 'FLAG': 'no', 'YADA': 'spam'}
+    assert calls == ['no']
+    assert f.getvalue() == """[DEFAULT]
+var = foo
+
+[settings]
+flag = false
+proxied = spam
+
+"""
+
+    # an empty table is still used as is, not rebuilt from the wrapper
+    empty = EnvWrapper().resolution_table()
+    assert env.collect(empty) == {}
+    out = io.StringIO()
+    env.to_json(out, table=empty)
+    assert json.loads(out.getvalue()) == {}
+    assert calls == ['no']
+
+
+@pytest.mark.parametrize('concurrent', [False, True])
+def test_export_many(os_env, concurrent):
+    env = EnvWrapper(
+        VAR=EnvVar(default='foo'),
+        VAR1=EnvVar(bundle='SETTINGS', default='bar'),
+        FLAG=EnvVar(convert=bool, default='no'),
+        FAKE=EnvVar(proxy='YADA', default='yada')
+    )
+    expected = {'json': io.StringIO(), 'ini': io.StringIO(),
+                'env': io.StringIO()}
+    env.to_json(expected['json'], sort_keys=True)
+    env.to_config(expected['ini'], bool_values=('off', 'on'))
+    env.to_source_file(expected['env'])
+
+    targets = {fmt: io.StringIO() for fmt in expected}
+    env.export_many(targets, options={
+        'json': {'sort_keys': True}, 'ini': {'bool_values': ('off', 'on')}
+    }, concurrent=concurrent)
+    for fmt, f in targets.items():
+        assert f.getvalue() == expected[fmt].getvalue()
+
+
+def test_export_many_unknown_format():
+    with pytest.raises(ValueError) as e:
+        EnvWrapper().export_many({'yaml': io.StringIO()})
+    assert str(e.value) == "Unknown export format 'yaml'"
+
+
+def test_apply_to_environ(os_env):
+    env = EnvWrapper(
+        VAR=EnvVar(default='foo'),
+        PREFIXED=EnvVar(prefix='APP_', default='bar'),
+        PROXIED=EnvVar(proxy='YADA', default='spam')
+    )
+    os_env.pop('VAR', None)
+    os_env['APP_PREFIXED'] = 'bar'
+    os_env.pop('YADA', None)
+    assert sorted(env.apply_to_environ()) == ['VAR', 'YADA']
+    assert os_env['VAR'] == 'foo'
+    assert os_env['YADA'] == 'spam'
+    assert env.apply_to_environ() == []
+
+    target = {'VAR': 'foo'}
+    assert sorted(env.apply_to_environ(target)) == ['APP_PREFIXED', 'YADA']
+
+
+def test_as_subprocess_env(os_env):
+    env = EnvWrapper(VAR=EnvVar(default='foo'))
+    base = {'PATH': '/bin'}
+    merged = env.as_subprocess_env(base=base)
+    assert merged == {'PATH': '/bin', 'VAR': 'foo'}
+    merged['PATH'] = '/usr/bin'
+    assert env.as_subprocess_env(base=base) == {'PATH': '/bin', 'VAR': 'foo'}
+
+    os_env['VAR'] = 'bar'
+    assert env.as_subprocess_env(base=base) == {'PATH': '/bin', 'VAR': 'bar'}
+
+    base['HOME'] = '/root'
+    assert env.as_subprocess_env(base=base) == {
+        'PATH': '/bin', 'HOME': '/root', 'VAR': 'bar'
+    }
+    assert env.as_subprocess_env()['VAR'] == 'bar'
+    assert env._subprocess_env is None
+
+
+def test_as_subprocess_env_generation(os_env):
+    os_env['VAR'] = 'foo'
+    hub = EnvHub()
+    env = EnvWrapper(VAR=EnvVar(), OTHER=EnvVar(default='x')).bind(hub)
+    merged = env.as_subprocess_env(base=hub)
+    assert merged['VAR'] == 'foo'
+    cached = env._subprocess_env
+    merged['VAR'] = 'mutated'
+    assert env.as_subprocess_env(base=hub)['VAR'] == 'foo'
+    assert env._subprocess_env is cached
+
+    with env.override(VAR='overridden'):
+        assert env.as_subprocess_env(base=hub)['VAR'] == 'overridden'
+    assert env.as_subprocess_env(base=hub)['VAR'] == 'foo'
+
+    os_env['VAR'] = 'bar'
+    assert env.as_subprocess_env(base=hub)['VAR'] == 'foo'
+    hub.refresh()
+    assert env.as_subprocess_env(base=hub)['VAR'] == 'bar'
+
+    env._declare('EXTRA', EnvVar(default='y'))
+    assert env.as_subprocess_env(base=hub)['EXTRA'] == 'y'
+
+    env._declare('PATHS', EnvVar(default='${OTHER}/bin'))
+    assert env.as_subprocess_env(base=hub)['PATHS'] == '${OTHER}/bin'
+    env.interpolate('PATHS')
+    assert env.as_subprocess_env(base=hub)['PATHS'] == 'x/bin'
+
+
+def test_override(os_env):
+    os_env['VAR'] = '1'
+    os_env['FLAG'] = 'yes'
+    env = EnvWrapper(
+        VAR=EnvVar(convert=int),
+        FLAG=EnvVar(convert=bool),
+        OPT=EnvVar(include_if='FLAG', default='x', bundle='B')
+    )
+    with env.override(VAR='2') as overridden:
+        assert overridden is env
+        assert env.VAR == 2
+        with env.override(FLAG='no'):
+            assert env.VAR == 2
+            assert env.FLAG is False
+            assert 'OPT' not in env
+            assert env.collect()['FLAG'] == 'no'
+        assert env.FLAG is True
+    assert env.VAR == 1
+    assert os_env['VAR'] == '1'
+
+    with pytest.raises(ConfigurationError):
+        with env.override(UNKNOWN='1'):
+            pass  # pragma: no cover
+
+
+def test_override_is_context_local(os_env):
+    os_env['VAR'] = '1'
+    env = EnvWrapper(VAR=EnvVar(convert=int))
+
+    async def read(value):
+        if value is None:
+            await asyncio.sleep(0)
+            return env.VAR
+        with env.override(VAR=value):
+            await asyncio.sleep(0)
+            return env.VAR
+
+    async def main():
+        return await asyncio.gather(read('2'), read(None), read('3'))
+
+    assert asyncio.run(main()) == [2, 1, 3]
+
+    with env.override(VAR='4'):
+        with ThreadPoolExecutor() as executor:
+            assert executor.submit(lambda: env.VAR).result() == 1
+
+
+def test_override_lazy_record(os_env):
+    os_env.pop('PORT', None)
+    env = EnvWrapper.from_source_file(io.StringIO('PORT=80\n'), lazy=True)
+    with env.override(PORT='8080'):
+        assert env.PORT == 8080
+        assert str(env._vars['PORT']) == '8080'
+    assert env.PORT == 80
+
+
+def test_bundle_conditions_resolved_once(os_env):
+    os_env['FLAG'] = 'yes'
+    os_env.pop('OFF', None)
+    calls = []
+
+    def counting_bool(value):
+        calls.append(value)
+        return EnvVar.TRUE_STRINGS.__contains__(value.lower())
+
+    members = {
+        f'GATED_{i}': EnvVar(bundle='B', include_if='FLAG', default=str(i))
+        for i in range(50)
+    }
+    env = EnvWrapper(
+        FLAG=EnvVar(convert=counting_bool),
+        OFF=EnvVar(convert=bool, default='no'),
+        SKIPPED=EnvVar(bundle='B', include_if='OFF', default='x'),
+        EXCLUDED=EnvVar(bundle='B', exclude_if='FLAG', default='x'),
+        FREE=EnvVar(bundle='B', default='free'),
+        **members
+    )
+    value = env.B
+    assert len(calls) == 1
+    assert value['free'] == 'free'
+    assert 'skipped' not in value and 'excluded' not in value
+    assert len(value) == 51
+
+    os_env['FLAG'] = 'no'
+    assert env.B == {'free': 'free', 'excluded': 'x'}
+
+
+def test_bundle_member_redeclared():
+    env = EnvWrapper(VAR=EnvVar(bundle='B', include_if='OFF'),
+                     OFF=EnvVar(convert=bool, default='no'))
+    bundle = env._bundles['B']
+    assert bundle.value == {}
+    member = EnvVar(bundle='B', default='1')
+    member.name = 'VAR'
+    bundle['VAR'] = member
+    assert list(bundle._partitions) == [(None, None)]
+    assert bundle.value == {'var': '1'}
+
+
+def test_from_files(os_env, tmp_path):
+    for name in ('HOST', 'PORT', 'DEBUG', 'REGION', 'USER', 'TIMEOUT'):
+        os_env.pop(name, None)
+    (tmp_path / 'base.env').write_text(
+        'HOST=localhost\nPORT=80\nDEBUG=false\n'
+    )
+    (tmp_path / 'region.ini').write_text(
+        'region = eu\nport = 8080\n[DB]\nuser = app\n'
+    )
+    (tmp_path / 'service.json').write_text(
+        '{"debug": "true", "db": {"timeout": "1.5"}}'
+    )
+    (tmp_path / 'override').write_text('{"host": "example.org"}')
+    timings = dict()
+
+    env = EnvWrapper.from_files(
+        [tmp_path / 'base.env', str(tmp_path / 'region.ini'),
+         tmp_path / 'service.json', (tmp_path / 'override', 'json')],
+        on_parsed=lambda path, seconds: timings.__setitem__(path, seconds)
+    )
+    assert env.HOST == 'example.org'
+    assert env.PORT == 8080
+    assert env.DEBUG is True
+    assert env.REGION == 'eu'
+    assert env.DB == {'user': 'app', 'timeout': 1.5}
+    assert sorted(timings) == sorted(
+        str(tmp_path / name)
+        for name in ('base.env', 'region.ini', 'service.json', 'override')
+    )
+    assert all(seconds >= 0 for seconds in timings.values())
+
+    with pytest.raises(ConfigurationError) as e:
+        EnvWrapper.from_files([(tmp_path / 'override', 'yaml')])
+    assert str(e.value) == \
+        f"Unknown file format 'yaml' for {tmp_path / 'override'}"
+
+    (tmp_path / 'utf8.env').write_bytes('USER=jos\u00e9\n'.encode('utf-8'))
+    assert EnvWrapper.from_files([tmp_path / 'utf8.env']).USER == \
+        'jos\u00e9'
@@ -0,0 +1,127 @@
+from envwrapper import ConfigurationError, EnvHub, EnvWrapper, EnvVar, \
+    LayeredEnv, SharedEnvSnapshot
+import io
+import os
+import pickle
+
+
+import pytest
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'environb'),
+                                reason='os.environb is not available')
+
+
+def test_raw_values_are_bytes(os_env):
+    os.environb[b'APP_BLOB'] = b'\x01\x02opaque'
+    os.environb[b'APP_FLAG'] = b'Yes'
+    os.environb[b'APP_COUNT'] = b'42'
+    os_env.pop('PROXIED', None)
+    env = EnvWrapper(
+        BLOB=EnvVar(prefix='APP_', binary=True),
+        FLAG=EnvVar(prefix='APP_', convert=bool, binary=True),
+        COUNT=EnvVar(prefix='APP_', convert=int, binary=True),
+        AS_BYTES=EnvVar(proxy='APP_BLOB', convert=bytes, binary=True),
+        MISSING=EnvVar(default='fallback', binary=True),
+    )
+    assert env.BLOB == b'\x01\x02opaque'
+    assert env.FLAG is True
+    assert env.COUNT == 42
+    assert env.AS_BYTES == b'\x01\x02opaque'
+    assert env.MISSING == b'fallback'
+
+    with env.override(COUNT='7', FLAG='no'):
+        assert env.COUNT == 7
+        assert env.FLAG is False
+
+    clone = pickle.loads(pickle.dumps(env))
+    assert clone.BLOB == b'\x01\x02opaque'
+
+
+def test_to_source_file(os_env):
+    os.environb[b'BLOB'] = b'caf\xc3\xa9 \xff'
+    os_env['TEXT'] = 'text'
+    env = EnvWrapper(BLOB=EnvVar(binary=True), TEXT=EnvVar())
+
+    f = io.BytesIO()
+    env.to_source_file(f, value_delimiter='"', sort_keys=True)
+    assert f.getvalue() == b'BLOB="caf\xc3\xa9 \xff"\nTEXT="text"\n'
+
+    f = io.StringIO()
+    env.to_source_file(f, sort_keys=True)
+    blob = os.fsdecode(b'caf\xc3\xa9 \xff')
+    assert f.getvalue() == f'BLOB={blob}\nTEXT=text\n'
+
+    f = io.StringIO()
+    env.to_json(f)
+    assert f.getvalue().startswith('{"blob": "caf\\u00e9 ')
+
+    table = env.resolution_table()
+    os.environb[b'BLOB'] = b'other'
+    f = io.BytesIO()
+    env.to_source_file(f, sort_keys=True, table=table)
+    assert f.getvalue() == b'BLOB=caf\xc3\xa9 \xff\nTEXT=text\n'
+
+
+def test_unsupported_combinations():
+    with pytest.raises(ConfigurationError):
+        EnvVar(binary=True, interpolate=True)
+    with pytest.raises(ConfigurationError):
+        EnvVar(binary=True, from_file=True)
+
+
+def test_interpolate_skips_binary(os_env):
+    os.environb[b'BLOB'] = b'${TEXT}'
+    env = EnvWrapper(BLOB=EnvVar(binary=True), TEXT=EnvVar(default='x'),
+                     PATH_=EnvVar(proxy='P', default='${TEXT}/bin'))
+    env.interpolate()
+    assert env.BLOB == b'${TEXT}'
+    assert env.PATH_ == 'x/bin'
+    with pytest.raises(ConfigurationError) as e:
+        env.interpolate('BLOB')
+    assert str(e.value) == 'Variable BLOB is binary and cannot be interpolated'
+    with pytest.raises(ConfigurationError):
+        env._vars['BLOB'].interpolator = env._interpolator
+
+
+BLOB = b'caf\xc3\xa9 \xff'
+
+
+def test_collect_and_apply(os_env):
+    os.environb[b'BLOB'] = BLOB
+    env = EnvWrapper(BLOB=EnvVar(binary=True))
+    assert env.collect() == {'BLOB': os.fsdecode(BLOB)}
+
+    target = {}
+    assert env.apply_to_environ(target) == ['BLOB']
+    assert target == {'BLOB': os.fsdecode(BLOB)}
+    assert env.apply_to_environ() == []
+
+    del os_env['BLOB']
+    env = EnvWrapper(BLOB=EnvVar(binary=True, default=BLOB))
+    assert env.apply_to_environ() == ['BLOB']
+    assert os.environb[b'BLOB'] == BLOB
+    assert env.as_subprocess_env(base={})['BLOB'] == os.fsdecode(BLOB)
+
+
+def test_bind_to_str_keyed_mappings(os_env):
+    os.environb[b'BLOB'] = BLOB
+    env = EnvWrapper(BLOB=EnvVar(binary=True, default=b'default'),
+                     COUNT=EnvVar(binary=True, convert=int, default='1'))
+
+    snapshot = env.snapshot()
+    assert snapshot.BLOB == BLOB
+    assert pickle.loads(pickle.dumps(snapshot)).BLOB == BLOB
+
+    with SharedEnvSnapshot.create(env) as shm:
+        assert shm['BLOB'] == os.fsdecode(BLOB)
+        other = EnvWrapper(BLOB=EnvVar(binary=True)).bind(shm)
+        assert other.BLOB == BLOB
+
+    hub = EnvHub()
+    assert EnvWrapper(BLOB=EnvVar(binary=True)).bind(hub).BLOB == BLOB
+    layered = LayeredEnv.stack(defaults={'COUNT': '5'})
+    env.bind(layered)
+    assert env.BLOB == BLOB
+    assert env.COUNT == 5
+    assert env.bind({}).BLOB == b'default'
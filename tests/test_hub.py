@@ -0,0 +1,96 @@
+from envwrapper import EnvHub, EnvWrapper, EnvVar
+
+
+class CountingCast:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, val):
+        self.calls += 1
+        return int(val)
+
+
+class Box:
+    def __init__(self, val):
+        self.val = val
+
+
+def test_consistent_snapshot(os_env):
+    os_env['WORKERS'] = '4'
+    hub = EnvHub()
+    env = EnvWrapper(WORKERS=EnvVar(convert=int)).bind(hub)
+    os_env['WORKERS'] = '8'
+    assert env.WORKERS == 4
+    assert hub.generation == 0
+    assert hub.refresh()
+    assert hub.generation == 1
+    assert env.WORKERS == 8
+    assert not hub.refresh()
+    assert hub.generation == 1
+
+
+def test_shared_resolution(os_env):
+    os_env['APP_PORT'] = '80'
+    cast = CountingCast()
+    hub = EnvHub()
+    first = EnvWrapper(PORT=EnvVar(prefix='APP_', convert=cast))
+    second = EnvWrapper(PORT=EnvVar(prefix='APP_', convert=cast),
+                        OTHER=EnvVar(proxy='APP_PORT', convert=cast))
+    hub.bind(first, second)
+    assert first.PORT == second.PORT == second.OTHER == 80
+    assert cast.calls == 2
+    os_env['APP_PORT'] = '81'
+    hub.refresh()
+    assert first.PORT == second.PORT == 81
+    assert cast.calls == 3
+
+
+def test_source_generation():
+    class Source(dict):
+        generation = 0
+
+    source = Source(FOO='bar')
+    hub = EnvHub(source)
+    env = EnvWrapper(FOO=EnvVar()).bind(hub)
+    source['FOO'] = 'baz'
+    assert not hub.refresh()
+    assert env.FOO == 'bar'
+    source.generation += 1
+    assert hub.refresh()
+    assert env.FOO == 'baz'
+    assert dict(hub) == {'FOO': 'baz'}
+    assert len(hub) == 1
+
+
+def test_fresh_values(os_env):
+    os_env.update({'D': "{'x': [1]}", 'HOSTS': 'a,b', 'IDS': '1,2'})
+
+    def declare():
+        return EnvWrapper(
+            D=EnvVar(convert=dict),
+            HOSTS=EnvVar(postprocessor=EnvVar.tokenize(',')),
+            IDS=EnvVar(convert=EnvVar.to_array('q')),
+            OBJ=EnvVar(convert=Box, default='x')
+        )
+
+    first, second = declare(), declare()
+    hub = EnvHub().bind(first, second)
+    first.D['x'].append(2)
+    first.HOSTS.append('c')
+    first.IDS[0] = 0
+    assert second.D == first.D == {'x': [1]}
+    assert second.HOSTS == first.HOSTS == ['a', 'b']
+    assert list(second.IDS) == list(first.IDS) == [1, 2]
+    assert first.OBJ is not first.OBJ
+    assert len(hub._values) == 3
+
+
+def test_equal_tokenizers_share_spec():
+    assert EnvVar.tokenize(',') == EnvVar.tokenize(',')
+    assert EnvVar.tokenize(',') != EnvVar.tokenize(',', lazy=True)
+    assert EnvVar.to_array('q') == EnvVar.to_array('q')
+    assert EnvVar.to_array('q') != EnvVar.to_array('d')
+    first = EnvVar(postprocessor=EnvVar.tokenize(','))
+    second = EnvVar(postprocessor=EnvVar.tokenize(','))
+    assert first.spec == second.spec
+    assert hash(first.spec) == hash(second.spec)
@@ -0,0 +1,100 @@
+from envwrapper import ConfigurationError, EnvWrapper, EnvVar
+from envwrapper.interpolation import Template, parse_template
+import io
+
+
+import pytest
+
+
+def test_template():
+    template = Template('a${B}c$${D}${E:-f}$x')
+    assert template.literals == ['a', 'c${D}', '$x']
+    assert template.references == [('B', None), ('E', 'f')]
+    assert template.render(('b', 'e')) == 'abc${D}e$x'
+    assert parse_template('${B}') is parse_template('${B}')
+
+
+def test_prefixes_proxies_and_os_names(os_env):
+    os_env['APP_DB_HOST'] = 'db'
+    os_env['PGPORT'] = '5432'
+    os_env['DB_USER'] = 'admin'
+    os_env.pop('DB_NAME', None)
+    env = EnvWrapper(
+        DB_HOST=EnvVar(prefix='APP_'),
+        DB_PORT=EnvVar(proxy='PGPORT'),
+        DB_URL=EnvVar(
+            default='postgres://${DB_USER}@${DB_HOST}:${DB_PORT}/'
+                    '${DB_NAME:-app}',
+            interpolate=True
+        ),
+        RAW=EnvVar(default='${DB_HOST}')
+    )
+    assert env.DB_URL == 'postgres://admin@db:5432/app'
+    assert env.RAW == '${DB_HOST}'
+    assert env.collect()['DB_URL'] == 'postgres://admin@db:5432/app'
+
+    os_env['APP_DB_HOST'] = 'replica'
+    assert env.DB_URL == 'postgres://admin@replica:5432/app'
+    with env.override(DB_HOST='local'):
+        assert env.DB_URL == 'postgres://admin@local:5432/app'
+
+
+def test_dependency_order_and_cast(os_env):
+    for name in ('BASE', 'PORT', 'NEXT_PORT', 'URL'):
+        os_env.pop(name, None)
+    env = EnvWrapper(
+        PORT=EnvVar(default='80${BASE:-00}', interpolate=True),
+        URL=EnvVar(default='http://host:${PORT}', interpolate=True),
+        NEXT_PORT=EnvVar(default='${PORT}1', convert=int, interpolate=True)
+    )
+    assert env.PORT == '8000'
+    assert env.URL == 'http://host:8000'
+    assert env.NEXT_PORT == 80001
+
+
+def test_memoized_until_a_reference_changes(os_env):
+    os_env['HOST'] = 'a'
+    env = EnvWrapper(URL=EnvVar(default='http://${HOST}/', interpolate=True))
+    url = env.URL
+    assert env.URL is url
+    os_env['HOST'] = 'b'
+    assert env.URL == 'http://b/'
+
+
+def test_cycles(os_env):
+    for name in ('A', 'B', 'C'):
+        os_env.pop(name, None)
+    env = EnvWrapper(
+        A=EnvVar(default='${B}', interpolate=True),
+        B=EnvVar(default='${C}', interpolate=True),
+        C=EnvVar(default='${A}', interpolate=True),
+    )
+    with pytest.raises(ConfigurationError) as e:
+        _ = env.B
+    assert str(e.value) == 'Circular reference: B -> C -> A -> B'
+    # the failed expansion leaves nothing behind
+    os_env['A'] = 'a'
+    assert env.B == 'a'
+
+
+def test_unknown_reference(os_env):
+    os_env.pop('UNKNOWN', None)
+    os_env['EMPTY'] = ''
+    env = EnvWrapper(
+        VAR=EnvVar(default='${UNKNOWN}', interpolate=True),
+        OTHER=EnvVar(default='[${EMPTY}]', interpolate=True)
+    )
+    with pytest.raises(ConfigurationError):
+        _ = env.VAR
+    assert env.OTHER == '[]'
+
+
+def test_interpolate_decoded_wrapper(os_env):
+    os_env.pop('HOST', None)
+    os_env.pop('URL', None)
+    env = EnvWrapper.from_source_file(
+        io.StringIO('HOST=example.org\nURL=https://${HOST}/\n'), lazy=True
+    ).interpolate()
+    assert env.URL == 'https://example.org/'
+    with pytest.raises(ConfigurationError):
+        env.interpolate('NOPE')
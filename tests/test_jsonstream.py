@@ -0,0 +1,95 @@
+from envwrapper import ConfigurationError, EnvWrapper
+from envwrapper.parser import JSONObjectStream
+import io
+import json
+
+
+import pytest
+
+
+DOCUMENT = {
+    'flag': 'false',
+    'settings': {'var1': 'bar', 'var2': 'true', 'nested': {'a': 1}},
+    'var': 'fo\\"o',
+    'count': 1234567,
+    'ratio': 1.25,
+    'scale': -2.5e-30,
+    'empty': {},
+    'items': [1, 2, {'x': None}],
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64 * 1024])
+def test_stream_members(chunk_size):
+    stream = JSONObjectStream(chunk_size=chunk_size)
+    f = io.StringIO(json.dumps(DOCUMENT, indent=2))
+    assert list(stream(f)) == [
+        ('', 'flag', 'false'),
+        ('settings', 'var1', 'bar'),
+        ('settings', 'var2', 'true'),
+        ('settings', 'nested', {'a': 1}),
+        ('', 'var', 'fo\\"o'),
+        ('', 'count', 1234567),
+        ('', 'ratio', 1.25),
+        ('', 'scale', -2.5e-30),
+        ('', 'items', [1, 2, {'x': None}]),
+    ]
+
+
+def test_stream_numbers_across_chunks():
+    document = '{"a": 1.5, "b": 2e3, "c": -0.25E+2, "d": 10}'
+    expected = [('', name, value) for name, value
+                in json.loads(document).items()]
+    for chunk_size in range(1, len(document) + 1):
+        stream = JSONObjectStream(chunk_size=chunk_size)
+        assert list(stream(io.StringIO(document))) == expected, chunk_size
+
+
+@pytest.mark.parametrize('document', [
+    '', '[]', '{"a" 1}', '{"a": 1', '{"a": 1,}', '{"a": 1} x', '{a: 1}'
+])
+def test_stream_errors(document):
+    stream = JSONObjectStream(chunk_size=2)
+    with pytest.raises(json.JSONDecodeError):
+        list(stream(io.StringIO(document)))
+
+
+def test_from_json_stream():
+    document = json.dumps({
+        'flag': 'false', 'count': 1234567,
+        'settings': {'var1': 'bar', 'var2': 'true'}, 'var': 'foo'
+    })
+    expected = EnvWrapper.from_json(io.StringIO(document))
+    env = EnvWrapper.from_json(io.StringIO(document), stream=True,
+                               chunk_size=5)
+    assert set(env.keys()) == set(expected.keys())
+    assert dict(env.items()) == dict(expected.items())
+    assert env.COUNT == 1234567
+
+
+def test_from_json_stream_hooks():
+    env = EnvWrapper.from_json(io.StringIO('{"ratio": 0.5}'), stream=True,
+                               parse_float=str)
+    assert env.RATIO == 0.5
+
+
+def test_from_json_stream_object_hooks():
+    def rename(pairs):
+        return {f'{k}_X': v for k, v in pairs}
+
+    for hooks in ({'object_pairs_hook': rename},
+                  {'object_hook': lambda d: rename(d.items())}):
+        with pytest.raises(ConfigurationError):
+            EnvWrapper.from_json(io.StringIO('{"A": 1}'), stream=True,
+                                 **hooks)
+        env = EnvWrapper.from_json(io.StringIO('{"A": 1}'), **hooks)
+        assert list(env.keys()) == ['A_X']
+
+    class Decoder(json.JSONDecoder):
+        def __init__(self, **kwargs):
+            kwargs['object_pairs_hook'] = rename
+            super().__init__(**kwargs)
+
+    with pytest.raises(ConfigurationError):
+        EnvWrapper.from_json(io.StringIO('{"A": 1}'), stream=True,
+                             decoder=Decoder)
@@ -0,0 +1,77 @@
+from envwrapper import ConfigurationError, EnvWrapper, EnvVar
+from envwrapper.kernels import CastKernelRegistry, to_bytesize, to_duration
+from datetime import timedelta
+
+
+import pytest
+
+
+def test_builtin_kernels(os_env):
+    env = EnvWrapper(
+        DATA=EnvVar(convert=bytes, default='foo'),
+        TIMEOUT=EnvVar(convert='duration', default='1m30s'),
+        MAX_BODY=EnvVar(convert='bytesize', default='10MB'),
+        OPTIONS=EnvVar(convert='json', default='{"retries": 3}'),
+        LEVELS=EnvVar(convert='literal', default="('a', 'b')")
+    )
+    assert env.DATA == b'foo'
+    assert env.TIMEOUT == timedelta(seconds=90)
+    assert env.MAX_BODY == 10 ** 7
+    assert env.OPTIONS == {'retries': 3}
+    assert env.LEVELS == ('a', 'b')
+
+
+def test_durations():
+    assert to_duration('45') == timedelta(seconds=45)
+    assert to_duration('1.5h') == timedelta(minutes=90)
+    assert to_duration('1h 30m') == timedelta(minutes=90)
+    assert to_duration('250ms') == timedelta(milliseconds=250)
+    assert to_duration('2d') == timedelta(days=2)
+    for bad in ('', '1x', 'h', '1h foo', 'inf', '-inf', 'nan', '1e20',
+                '1e300w'):
+        with pytest.raises(ValueError):
+            to_duration(bad)
+
+
+def test_bytesizes():
+    assert to_bytesize('512') == 512
+    assert to_bytesize('64k') == 64 * 1024
+    assert to_bytesize('1.5GiB') == 3 * 2 ** 29
+    assert to_bytesize('2 kb') == 2000
+    for bad in ('', 'ten', '10 parsecs', '9' * 400 + '.5'):
+        with pytest.raises(ValueError):
+            to_bytesize(bad)
+
+
+def test_register_custom_kernel(os_env):
+    EnvVar.KERNELS.register('csv', lambda val: val.split(','))
+    try:
+        env = EnvWrapper(HOSTS=EnvVar(convert='csv', default='a,b'))
+        assert env.HOSTS == ['a', 'b']
+    finally:
+        EnvVar.KERNELS.unregister('csv')
+    assert 'csv' not in EnvVar.KERNELS
+    with pytest.raises(ConfigurationError):
+        EnvVar(convert='csv')
+    with pytest.raises(KeyError):
+        EnvVar.KERNELS.unregister('csv')
+
+
+def test_unknown_kernel_name():
+    with pytest.raises(ConfigurationError) as e:
+        EnvVar(convert='yada')
+    assert str(e.value) == "No cast kernel registered under the name 'yada'"
+
+
+def test_kernel_factory():
+    registry = CastKernelRegistry()
+    registry.register_factory(bool, lambda var: lambda val: val == var.name)
+
+    class Var(EnvVar):
+        KERNELS = registry
+
+    var = Var(convert=bool)
+    var.name = 'YES'
+    assert Var(convert=int).pipeline('3') == 3
+    assert var.pipeline('YES') is True
+    assert {} not in registry
@@ -0,0 +1,59 @@
+from envwrapper import EnvHub, EnvWrapper, EnvVar, LayeredEnv
+
+
+def test_precedence(os_env):
+    os_env['PORT'] = '8080'
+    os_env.pop('HOST', None)
+    layers = LayeredEnv.stack(
+        defaults={'HOST': 'localhost', 'PORT': '80', 'DEBUG': 'no'},
+        files=[{'DEBUG': 'yes'}],
+        overrides={'HOST': '0.0.0.0'}
+    )
+    env = EnvWrapper(
+        HOST=EnvVar(), PORT=EnvVar(convert=int), DEBUG=EnvVar(convert=bool)
+    ).bind(layers)
+    assert env.HOST == '0.0.0.0'
+    assert env.PORT == 8080
+    assert env.DEBUG is True
+    assert len(layers.layers) == 4
+
+
+def test_child_is_copy_on_write():
+    parent = LayeredEnv({'A': '1', 'B': '2'})
+    child = parent.child({'B': '3'}, C='4')
+    grandchild = child.child(A='5')
+
+    assert dict(parent) == {'A': '1', 'B': '2'}
+    assert dict(child) == {'A': '1', 'B': '3', 'C': '4'}
+    assert dict(grandchild) == {'A': '5', 'B': '3', 'C': '4'}
+    assert len(child) == 3
+    assert 'C' in child and 'C' not in parent
+    assert child.get('D', 'none') == 'none'
+    assert grandchild.overrides == {'A': '5', 'B': '3', 'C': '4'}
+    assert grandchild._root._index is parent._index
+
+
+def test_refresh(os_env):
+    os_env['LAYERED'] = 'before'
+    layers = LayeredEnv({'LAYERED': 'default'}, os_env)
+    child = layers.child(OTHER='x')
+    os_env['LAYERED'] = 'after'
+    assert child['LAYERED'] == 'before'
+    assert not LayeredEnv({}).refresh()
+
+    assert child.refresh()
+    assert child['LAYERED'] == 'after'
+    assert layers.generation == child.generation == 1
+    assert not layers.refresh()
+
+
+def test_hub_honours_generation(os_env):
+    os_env['LAYERED'] = '1'
+    layers = LayeredEnv(os_env)
+    hub = EnvHub(layers)
+    env = EnvWrapper(LAYERED=EnvVar(convert=int)).bind(hub)
+    os_env['LAYERED'] = '2'
+    assert not hub.refresh()
+    layers.refresh()
+    assert hub.refresh()
+    assert env.LAYERED == 2
@@ -0,0 +1,51 @@
+from envwrapper import EnvWrapper, EnvVar
+from envwrapper.lazy import LazyTokens
+
+
+import pytest
+
+
+class CountingCast:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        return int(token)
+
+
+def test_lazy_tokenize(os_env):
+    cast = CountingCast()
+    env = EnvWrapper(
+        VALUES=EnvVar(postprocessor=EnvVar.tokenize(sep=',', lazy=True),
+                      sub_cast=cast)
+    )
+    os_env['VALUES'] = '1,2,3,4,5'
+    values = env.VALUES
+    assert isinstance(values, LazyTokens)
+    assert len(values) == 5
+    assert cast.calls == 0
+    assert values[1] == 2
+    assert values[1] == 2
+    assert values[-1] == 5
+    assert cast.calls == 2
+    assert values == [1, 2, 3, 4, 5]
+    assert values[1:3] == [2, 3]
+    with pytest.raises(IndexError):
+        _ = values[5]
+
+
+def test_lazy_matches_split():
+    for value in ('', 'a', 'a,,b', ',a,', 'a,b,c'):
+        tokens = LazyTokens(value, ',')
+        assert len(tokens) == len(value.split(','))
+        assert list(tokens) == value.split(',')
+        assert [tokens[i] for i in range(len(tokens))] == value.split(',')
+
+
+def test_lazy_multichar_sep():
+    tokens = LazyTokens('a::b::c', '::')
+    assert tokens[2] == 'c'
+    assert list(tokens) == ['a', 'b', 'c']
+    with pytest.raises(ValueError):
+        LazyTokens('a', '')
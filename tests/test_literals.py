@@ -0,0 +1,74 @@
+from envwrapper import EnvWrapper, EnvVar
+from envwrapper.literals import LiteralParser
+from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+import sys
+
+
+import pytest
+
+
+@pytest.mark.parametrize('value', [
+    "{'foo': '1', 'bar': [2, 3.5, -4], 'spam': (None, True, False)}",
+    "('1', '2', '3')", "(1,)", "(1)", "()", "[]", "{}", "[1, ]",
+    "{(1, 2): 'tuple key'}", '{"json": [1, 2.5, "three"]}',
+    "'a\\nb'", "{1, 2}", "0x10", "[1e3, .5, 2.]"
+])
+def test_same_as_literal_eval(value):
+    parse = LiteralParser()
+    result = parse(value)
+    assert result == literal_eval(value)
+    assert type(result) is type(literal_eval(value))
+
+
+@pytest.mark.parametrize('value', ['[1 2]', '{1: }', 'foo', '[1', ''])
+def test_invalid_literals(value):
+    parse = LiteralParser()
+    with pytest.raises((ValueError, SyntaxError)):
+        parse(value)
+
+
+def test_cache_returns_copies():
+    parse = LiteralParser()
+    first = parse("{'hosts': ['a', 'b']}")
+    first['hosts'].append('c')
+    assert parse("{'hosts': ['a', 'b']}") == {'hosts': ['a', 'b']}
+
+
+def test_cache_is_bounded():
+    parse = LiteralParser(max_entries=2, max_size=20)
+    parse('[1]')
+    parse('[2]')
+    parse('[3]')
+    assert len(parse._cache) == 2
+    parse('[' + ', '.join(['1'] * 8) + ']')
+    assert parse._size <= 20
+    parse('[' + ', '.join(['1'] * 20) + ']')
+    assert parse._size <= 20
+    parse.clear()
+    assert not parse._cache
+
+
+def test_cache_is_thread_safe():
+    # switch threads as often as possible to expose races
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    parse = LiteralParser(max_entries=4)
+
+    def work(i):
+        for j in range(300):
+            assert parse(f'[{(i + j) % 8}]') == [(i + j) % 8]
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(work, range(8)))
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(parse._cache) <= 4
+
+
+def test_dict_var_uses_parser(os_env):
+    env = EnvWrapper(SETTINGS=EnvVar(convert=dict, sub_cast=int))
+    os_env['SETTINGS'] = '{"foo": "1", "bar": "2"}'
+    assert env.SETTINGS == {'foo': 1, 'bar': 2}
+    assert env.SETTINGS == {'foo': 1, 'bar': 2}
@@ -0,0 +1,103 @@
+from concurrent.futures import ProcessPoolExecutor
+from envwrapper import EnvWrapper, EnvVar
+import io
+import pickle
+
+
+def declare():
+    return EnvWrapper(
+        HOST=EnvVar(prefix='APP_', default='localhost'),
+        PORT=EnvVar(proxy='PGPORT', convert=int, default='5432'),
+        DEBUG=EnvVar(convert=bool, bundle='FLAGS'),
+        VERBOSE=EnvVar(convert=bool, bundle='FLAGS', include_if='DEBUG'),
+        HOSTS=EnvVar(postprocessor=EnvVar.tokenize(','), sub_cast=str,
+                     default='a,b'),
+        LAZY=EnvVar(postprocessor=EnvVar.tokenize(lazy=True), sub_cast=int,
+                    default='1 2'),
+        URL=EnvVar(default='http://${HOST}:${PORT}/', interpolate=True),
+        TIMEOUT=EnvVar(convert='duration', default='1m'),
+    )
+
+
+def values(env):
+    return {name: env[name] for name in env.keys()}
+
+
+def test_roundtrip(os_env):
+    for name in ('APP_HOST', 'PGPORT', 'DEBUG', 'VERBOSE', 'HOSTS',
+                 'LAZY', 'URL', 'TIMEOUT'):
+        os_env.pop(name, None)
+    env = declare()
+    clone = pickle.loads(pickle.dumps(env))
+    assert values(clone) == values(env)
+    assert clone.URL == 'http://localhost:5432/'
+
+    os_env['APP_HOST'] = 'example.org'
+    os_env['DEBUG'] = 'yes'
+    assert clone.URL == 'http://example.org:5432/'
+    assert clone.FLAGS == {'debug': True, 'verbose': False}
+    assert clone._vars['PORT'].pipeline is not env._vars['PORT'].pipeline
+
+
+class Source(dict):
+    pass
+
+
+def test_bound_mapping_does_not_travel(os_env):
+    os_env.pop('VAR', None)
+    env = EnvWrapper(VAR=EnvVar(default='x')).bind(Source(VAR='y'))
+    assert env.VAR == 'y'
+    assert pickle.loads(pickle.dumps(env)).VAR == 'x'
+
+
+def test_snapshot(os_env):
+    os_env['APP_HOST'] = 'example.org'
+    os_env['PGPORT'] = '6543'
+    env = declare()
+    snapshot = env.snapshot()
+    os_env['APP_HOST'] = 'changed'
+    clone = pickle.loads(pickle.dumps(snapshot))
+    assert clone.HOST == 'example.org'
+    assert clone.PORT == 6543
+    assert clone.URL == 'http://example.org:6543/'
+    assert env.HOST == 'changed'
+
+
+def test_lazy_records(os_env):
+    os_env.pop('PORT', None)
+    os_env.pop('NAME', None)
+    env = EnvWrapper.from_config(
+        io.StringIO('[DEFAULT]\nport = 80\n[APP]\nname = app\n'), lazy=True
+    )
+    data = pickle.dumps(env)
+    assert b'variables' not in data
+    clone = pickle.loads(data)
+    assert clone.PORT == 80
+    assert clone.APP == {'port': 80, 'name': 'app'}
+
+
+def read_all(env):
+    return values(env)
+
+
+def test_process_pool(os_env):
+    os_env['APP_HOST'] = 'example.org'
+    env = declare().snapshot()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert executor.submit(read_all, env).result() == values(env)
+
+
+def test_snapshot_interpolated(os_env):
+    os_env.pop('HOME', None)
+    os_env['PRICE'] = 'cost $${HOME}'
+    os_env['GREETING'] = 'hello ${NAME}'
+    os_env['NAME'] = 'world'
+    env = EnvWrapper(PRICE=EnvVar(interpolate=True), NAME=EnvVar(),
+                     GREETING=EnvVar(interpolate=True))
+    snapshot = env.snapshot()
+    os_env['NAME'] = 'changed'
+    clone = pickle.loads(pickle.dumps(snapshot))
+    for wrapper in (snapshot, clone):
+        assert wrapper.PRICE == 'cost ${HOME}'
+        assert wrapper.GREETING == 'hello world'
+    assert env.GREETING == 'hello changed'
@@ -0,0 +1,107 @@
+from envwrapper import ConfigurationError, EnvHub, EnvWrapper, EnvVar
+from envwrapper.secrets import SecretFileCache
+import os
+
+
+import pytest
+
+
+@pytest.fixture()
+def secrets():
+    EnvVar.SECRETS.clear()
+    yield EnvVar.SECRETS
+    EnvVar.SECRETS.clear()
+
+
+def write(path, content):
+    path.write_text(content)
+    # make sure the modification time changes on coarse file systems
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000))
+
+
+def test_read_once(tmp_path, secrets, monkeypatch):
+    path = tmp_path / 'secret'
+    write(path, 's3cr3t\n')
+    cache = SecretFileCache()
+    assert cache.read(str(path)) == 's3cr3t'
+    assert str(path) in cache
+
+    def fail(*_, **__):  # pragma: no cover
+        raise AssertionError('file reopened')
+
+    monkeypatch.setattr('builtins.open', fail)
+    assert cache.read(str(path)) == 's3cr3t'
+
+
+def test_refresh(tmp_path):
+    path = tmp_path / 'secret'
+    write(path, 'one\r\n')
+    cache = SecretFileCache()
+    assert cache.read(str(path)) == 'one'
+    assert cache.refresh() == []
+
+    write(path, 'two')
+    assert cache.read(str(path)) == 'one'
+    assert cache.refresh() == [str(path)]
+    assert cache.read(str(path)) == 'two'
+
+    path.unlink()
+    generation = cache.generation
+    assert cache.refresh() == [str(path)]
+    assert len(cache) == 0
+    assert cache.generation == generation + 1
+    assert cache.refresh() == []
+    assert cache.generation == generation + 1
+
+
+def test_file_backed_envvar(tmp_path, os_env, secrets):
+    password = tmp_path / 'password'
+    write(password, 'hunter2\n')
+    os_env['DB_PASSWORD_FILE'] = str(password)
+    os_env['APP_PORT_FILE'] = str(tmp_path / 'port')
+    write(tmp_path / 'port', '5432')
+    os_env['PLAIN'] = 'plain'
+    os_env.pop('PLAIN_FILE', None)
+
+    env = EnvWrapper(
+        DB_PASSWORD=EnvVar(from_file=True),
+        PORT=EnvVar(prefix='APP_', convert=int, from_file=True),
+        PLAIN=EnvVar(from_file=True),
+        NOT_A_FILE=EnvVar(default='x')
+    )
+    assert env.DB_PASSWORD == 'hunter2'
+    assert env.PORT == 5432
+    assert env.PLAIN == 'plain'
+    assert env.refresh_files() == []
+
+    write(password, 'correct horse')
+    assert env.DB_PASSWORD == 'hunter2'
+    assert env.refresh_files() == ['DB_PASSWORD']
+    assert env.DB_PASSWORD == 'correct horse'
+
+
+def test_file_backed_envvar_hub(tmp_path, os_env, secrets):
+    password = tmp_path / 'password'
+    write(password, 'hunter2')
+    os_env['DB_PASSWORD_FILE'] = str(password)
+    hub = EnvHub()
+    env = EnvWrapper(DB_PASSWORD=EnvVar(from_file=True)).bind(hub)
+    other = EnvWrapper(DB_PASSWORD=EnvVar(from_file=True)).bind(hub)
+    assert env.DB_PASSWORD == 'hunter2'
+    assert other.as_subprocess_env(base=hub)['DB_PASSWORD'] == 'hunter2'
+
+    write(password, 'correct horse')
+    assert env.refresh_files() == ['DB_PASSWORD']
+    assert env.DB_PASSWORD == 'correct horse'
+    assert other.DB_PASSWORD == 'correct horse'
+    assert other.as_subprocess_env(base=hub)['DB_PASSWORD'] == \
+        'correct horse'
+
+
+def test_missing_file(tmp_path, os_env, secrets):
+    os_env['DB_PASSWORD_FILE'] = str(tmp_path / 'missing')
+    env = EnvWrapper(DB_PASSWORD=EnvVar(from_file=True))
+    with pytest.raises(ConfigurationError) as e:
+        _ = env.DB_PASSWORD
+    assert str(e.value).startswith('Cannot read DB_PASSWORD_FILE: ')
@@ -0,0 +1,110 @@
+from envwrapper import EnvWrapper, EnvVar, SharedEnvSnapshot
+import multiprocessing as mp
+import os
+import struct
+import subprocess
+import sys
+
+
+import pytest
+
+
+def make_env():
+    return EnvWrapper(
+        WORKERS=EnvVar(convert=int, default='4'),
+        DEBUG=EnvVar(convert=bool, prefix='APP_', default='off'),
+        NAME=EnvVar(proxy='SERVICE_NAME', default='svc'),
+        HOSTS=EnvVar(postprocessor=EnvVar.tokenize(','), default='a,b'),
+        LABEL=EnvVar(default='café')
+    )
+
+
+def test_snapshot_mapping(os_env):
+    os_env['APP_DEBUG'] = 'on'
+    with SharedEnvSnapshot.create(make_env()) as snapshot:
+        assert len(snapshot) == 5
+        assert sorted(snapshot) == ['APP_DEBUG', 'HOSTS', 'LABEL',
+                                    'SERVICE_NAME', 'WORKERS']
+        assert snapshot['APP_DEBUG'] == 'on'
+        assert snapshot['LABEL'] == 'café'
+        assert snapshot.get('YADA') is None
+        view = snapshot.raw('WORKERS')
+        assert bytes(view) == b'4'
+        assert view.readonly
+        with pytest.raises(TypeError):
+            view[0] = ord('8')
+        view.release()
+        attached = SharedEnvSnapshot.attach(snapshot.name)
+        view = attached.raw('WORKERS')
+        assert view.readonly
+        view.release()
+        attached.close()
+
+
+def test_bind_to_snapshot(os_env):
+    os_env['APP_DEBUG'] = 'on'
+    with SharedEnvSnapshot.create(make_env()) as snapshot:
+        os_env.clear()
+        env = make_env().bind(snapshot)
+        assert env.DEBUG is True
+        assert env.WORKERS == 4
+        assert env.NAME == 'svc'
+        assert env.HOSTS == ['a', 'b']
+
+
+def test_empty_snapshot():
+    with SharedEnvSnapshot.create(EnvWrapper()) as snapshot:
+        assert len(snapshot) == 0
+        assert 'FOO' not in snapshot
+
+
+def _read_workers(name, queue):
+    snapshot = SharedEnvSnapshot.attach(name)
+    env = make_env().bind(snapshot)
+    queue.put((env.WORKERS, env.DEBUG, env.LABEL))
+    snapshot.close()
+
+
+def test_attach_from_worker(os_env):
+    os_env['WORKERS'] = '12'
+    ctx = mp.get_context('spawn')
+    with SharedEnvSnapshot.create(make_env()) as snapshot:
+        queue = ctx.Queue()
+        p = ctx.Process(target=_read_workers, args=(snapshot.name, queue))
+        p.start()
+        result = queue.get(timeout=30)
+        p.join()
+    assert result == (12, False, 'café')
+
+
+def test_attach_from_unrelated_process(os_env):
+    with SharedEnvSnapshot.create(make_env()) as snapshot:
+        code = (
+            'from envwrapper import SharedEnvSnapshot\n'
+            f'SharedEnvSnapshot.attach({snapshot.name!r}).close()\n'
+        )
+        # stderr is only closed once the resource tracker of the process
+        # has exited, after it cleaned up what it tracked
+        result = subprocess.run(
+            [sys.executable, '-c', code], check=True, capture_output=True,
+            text=True, cwd=os.path.dirname(os.path.dirname(__file__))
+        )
+        assert 'leaked shared_memory' not in result.stderr
+        SharedEnvSnapshot.attach(snapshot.name).close()
+
+
+class FailingHeader:
+    size = SharedEnvSnapshot._HEADER.size
+
+    def pack_into(self, *_):
+        raise struct.error('packing failed')
+
+
+def test_create_failure_destroys_segment(os_env, monkeypatch):
+    name = f'envwrapper-test-{os.getpid()}'
+    monkeypatch.setattr(SharedEnvSnapshot, '_HEADER', FailingHeader())
+    with pytest.raises(struct.error):
+        SharedEnvSnapshot.create(make_env(), name=name)
+    monkeypatch.undo()
+    with pytest.raises(FileNotFoundError):
+        SharedEnvSnapshot.attach(name)